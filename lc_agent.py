@@ -1,32 +1,24 @@
-import sys, json
+import sys
 # Import relevant functionality
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.sqlite import SqliteSaver
+from lc_stream import stream_graph_turns, print_metrics
+from lc_checkpoint import CompactSqliteSaver
 from langgraph.prebuilt import create_react_agent
 from langchain_community.tools import WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_openai import AzureChatOpenAI
+from lc_tool_cache import cached_tool
+from lc_clients import chat_model
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
 
 def main():
     try:
         print("Hello, LangChain Agent!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0.9)
+        model = chat_model(temperature=0.9)
 
         # Create the agent
-        wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+        # Repeated lookups are served from a TTL cache (memory + disk)
+        wikipedia = cached_tool(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper()), ttl=24 * 3600, path="./cache/wikipedia.sqlite")
         tools = [wikipedia]
 
         run_option = 1
@@ -41,7 +33,8 @@ def main():
                 print(f"ContentString: {response.content}")
                 print(f"ToolCalls: {response.tool_calls}")
             case 1:
-                memory = SqliteSaver.from_conn_string(":memory:")
+                # Durable checkpoints that survive restarts; only the newest 20 per thread are kept
+                memory = CompactSqliteSaver("./cache/checkpoints_agent.sqlite", keep_last=20)
                 agent_executor = create_react_agent(model, tools, checkpointer=memory)
                 # Use the agent
                 config = {"configurable": {"thread_id": "abc123"}}
@@ -55,6 +48,15 @@ def main():
                 ):
                     print(chunk)
                     print("----")
+            case 2:
+                # Token streaming with time-to-first-token and per-node latency
+                memory = CompactSqliteSaver("./cache/checkpoints_agent.sqlite", keep_last=20)
+                agent_executor = create_react_agent(model, tools, checkpointer=memory)
+                config = {"configurable": {"thread_id": "abc124"}}
+                queries = ["hi im bob! and i live in taoyuan city", "who is the president of the country of where I live?"]
+                # All turns run in one event loop
+                turns = [{"messages": [HumanMessage(content=query)]} for query in queries]
+                stream_graph_turns(agent_executor, turns, config, on_turn=lambda _, metrics: (print_metrics(metrics), print("----")))
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
 
@@ -0,0 +1,123 @@
+# Semantic answer cache in front of a RAG chain
+import time, hashlib, threading
+from collections import OrderedDict
+from typing import Any, Optional
+from langchain_core.runnables import Runnable, RunnableConfig
+from lc_pipeline import split_id
+
+def _normalize(vector):
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+# Fingerprint of what the retriever returns for a question; an answer is only reused
+# while the same context would be retrieved, so re-indexed documents never serve stale answers
+def context_fingerprint(docs) -> str:
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(split_id(doc).encode("ascii"))
+    return digest.hexdigest()
+
+# Answer cache in front of the answering half of a RAG chain. The cache retrieves once per
+# request: the documents fingerprint the context and, on a miss, are passed to `chain` under
+# `context_key`, so the chain does not retrieve again. Input is a str, or a dict with the
+# question under `input_key`; the chain gets that dict (or {input_key: question}) plus the
+# documents. A prior answer is served when its question embedding has cosine similarity
+# >= `threshold` with the new one and the retrieved context is unchanged. Entries expire
+# after `ttl` seconds and the least recently used are evicted beyond `max_entries`.
+class SemanticCache(Runnable):
+    def __init__(self, chain: Runnable, retriever, embed, threshold: float = 0.95, ttl: Optional[float] = 3600.0, max_entries: int = 1000,
+                 input_key: str = "input", context_key: str = "context"):
+        self.chain = chain
+        self.retriever = retriever
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.input_key = input_key
+        self.context_key = context_key
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._entries = OrderedDict()
+        self._by_context = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _question(self, input: Any) -> str:
+        return input if isinstance(input, str) else input[self.input_key]
+
+    def _chain_input(self, input: Any, docs: list) -> dict:
+        fields = {self.input_key: input} if isinstance(input, str) else dict(input)
+        return {**fields, self.context_key: docs}
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_context[entry["context"]]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_context[entry["context"]]
+
+    def _expire(self, now: float):
+        if self.ttl is None:
+            return
+        # Entries are kept in recency order, but TTL counts from creation, so scan them all
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if now - entry["created"] > self.ttl]:
+            self._drop(entry_id)
+            self.metrics["expired"] += 1
+
+    def _lookup(self, vector, context: str):
+        best_id, best_score = None, self.threshold
+        for entry_id in self._by_context.get(context, ()):
+            score = sum(a * b for a, b in zip(vector, self._entries[entry_id]["vector"]))
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+        return best_id
+
+    # (True, answer) on a hit, (False, None) on a miss
+    def _get(self, vector, context: str) -> tuple:
+        with self._lock:
+            self._expire(time.monotonic())
+            entry_id = self._lookup(vector, context)
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                self.metrics["hits"] += 1
+                return True, self._entries[entry_id]["answer"]
+            self.metrics["misses"] += 1
+            return False, None
+
+    def _put(self, vector, context: str, answer: Any):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {"vector": vector, "context": context, "answer": answer, "created": time.monotonic()}
+            self._by_context.setdefault(context, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.metrics["evicted"] += 1
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        question = self._question(input)
+        vector = _normalize(self.embed.embed_query(question))
+        docs = self.retriever.invoke(question, config)
+        context = context_fingerprint(docs)
+        hit, answer = self._get(vector, context)
+        if hit:
+            return answer
+        answer = self.chain.invoke(self._chain_input(input, docs), config, **kwargs)
+        self._put(vector, context, answer)
+        return answer
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        question = self._question(input)
+        vector = _normalize(await self.embed.aembed_query(question))
+        docs = await self.retriever.ainvoke(question, config)
+        context = context_fingerprint(docs)
+        hit, answer = self._get(vector, context)
+        if hit:
+            return answer
+        answer = await self.chain.ainvoke(self._chain_input(input, docs), config, **kwargs)
+        self._put(vector, context, answer)
+        return answer
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.metrics["hits"] + self.metrics["misses"]
+            return {**self.metrics, "entries": len(self._entries), "hit_rate": self.metrics["hits"] / total if total else 0.0}
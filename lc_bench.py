@@ -0,0 +1,252 @@
+# Offline benchmark suite for the lc_* pipelines, run against local stand-ins
+import sys, json, time, uuid, argparse, platform, subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module; peak RSS is then not reported
+    resource = None
+
+PIPELINES = ("rag", "pdf", "sqlite", "langgraph", "pandas_df")
+
+# Peak resident set size of this process so far, in MB. Each pipeline runs in a process of
+# its own (see run), so this is the peak of that pipeline up to the end of the stage.
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# Collects one result row per stage: wall time, item count, throughput and peak RSS
+class Bench:
+    def __init__(self, pipeline: str, run_info: dict):
+        self.pipeline = pipeline
+        self.run_info = run_info
+        self.rows = []
+
+    @contextmanager
+    def stage(self, name: str):
+        record = {"items": None}
+        start = time.perf_counter()
+        yield record
+        seconds = time.perf_counter() - start
+        items = record["items"]
+        self.rows.append({
+            **self.run_info,
+            "pipeline": self.pipeline,
+            "stage": name,
+            "seconds": round(seconds, 6),
+            "items": items,
+            "throughput": round(items / seconds, 3) if items and seconds > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None,
+        })
+
+def rag_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", "Use the following pieces of retrieved context to answer the question.\n\n{context}"),
+            ("human", "{input}"),
+        ]
+    )
+
+def bench_index_and_query(bench: Bench, args, docs_stage, questions, splitter=None):
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from lc_embed_batch import ConcurrentEmbeddings
+    from lc_fake import FakeChatModel, FakeEmbeddingServer, FakeEmbeddingClient
+    from lc_pipeline import upsert_stream
+
+    with FakeEmbeddingServer(latency=args.embed_latency, max_concurrent=args.embed_concurrency) as embed_server:
+        embed = ConcurrentEmbeddings(FakeEmbeddingClient(embed_server.url), max_concurrency=args.embed_concurrency, base_backoff=0.05)
+        model = FakeChatModel(latency=args.llm_latency, token_rate=args.token_rate)
+
+        with bench.stage("load") as stage:
+            docs = docs_stage()
+            stage["items"] = len(docs)
+        with bench.stage("split") as stage:
+            splitter = splitter or RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+            splits = splitter.split_documents(docs)
+            stage["items"] = len(splits)
+        with bench.stage("index") as stage:
+            if args.store == "chroma":
+                from langchain_chroma import Chroma
+                vectorstore = Chroma(collection_name=f"bench_{uuid.uuid4().hex}", embedding_function=embed)
+            else:
+                from lc_vector_store import NumpyVectorStore
+                vectorstore = NumpyVectorStore(embed, dtype=args.store)
+            upsert_stream(splits, vectorstore)
+            stage["items"] = len(splits)
+
+        rag_chain = create_retrieval_chain(vectorstore.as_retriever(), create_stuff_documents_chain(model, rag_prompt()))
+        with bench.stage("query") as stage:
+            for question in questions:
+                rag_chain.invoke({"input": question})
+            stage["items"] = len(questions)
+
+def bench_rag(bench: Bench, args):
+    import bs4
+    from langchain_community.document_loaders import WebBaseLoader
+    from lc_fake import FakeDocumentServer
+
+    with FakeDocumentServer(paragraphs=args.paragraphs, latency=args.doc_latency) as doc_server:
+        loader = WebBaseLoader(
+            web_paths=(f"{doc_server.url}/post",),
+            bs_kwargs=dict(parse_only=bs4.SoupStrainer(class_=("post-content", "post-title", "post-header"))),
+        )
+        questions = ["What is Task Decomposition?"] * args.questions
+        bench_index_and_query(bench, args, loader.load, questions)
+
+def bench_pdf(bench: Bench, args):
+    from lc_pdf_loader import ParallelPDFLoader
+    from lc_legal_splitter import LegalTextSplitter
+
+    loader = ParallelPDFLoader(["./data/LaborStandardsAct.pdf"], ordered=True)
+    questions = ["勞工犯了那些錯，雇主就可以終止契約?"] * args.questions
+    # Same per-article split as lc_pdf
+    bench_index_and_query(bench, args, loader.load, questions, LegalTextSplitter())
+
+def bench_sqlite(bench: Bench, args):
+    from langchain.chains import create_sql_query_chain
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+    from lc_fake import FakeChatModel, FakeEmbeddingServer, FakeEmbeddingClient
+    from lc_sql_pool import ReadOnlySQLitePool, QueryReadOnlySQLTool
+    from lc_sql_schema import CachedSQLDatabase, TableSelector
+
+    model = FakeChatModel(default_response='SELECT COUNT(*) FROM "Employee";', latency=args.llm_latency, token_rate=args.token_rate)
+    with FakeEmbeddingServer(latency=args.embed_latency, max_concurrent=args.embed_concurrency) as embed_server:
+        embed = FakeEmbeddingClient(embed_server.url)
+        with bench.stage("schema") as stage:
+            db = CachedSQLDatabase.from_uri("sqlite:///data/Chinook.db")
+            selector = TableSelector(db, embed)
+            selector.select("warm up")
+            stage["items"] = len(selector.tables)
+        pool = ReadOnlySQLitePool("data/Chinook.db")
+        select_tables = RunnablePassthrough.assign(table_names_to_use=RunnableLambda(lambda x: selector.select(x["question"])))
+        chain = select_tables | create_sql_query_chain(model, db) | QueryReadOnlySQLTool(pool=pool)
+        with bench.stage("query") as stage:
+            for _ in range(args.questions):
+                chain.invoke({"question": "How many employees are there"})
+            stage["items"] = args.questions
+        pool.close()
+
+def bench_langgraph(bench: Bench, args):
+    from langchain_core.messages import HumanMessage
+    from lc_checkpoint import CompactSqliteSaver
+    from lc_fake import FakeChatModel, FakeWikipediaTool
+    from lc_langgraph import build_app
+    from lc_stream import astream_graph
+    from lc_tool_node import create_concurrent_tool_node
+    import asyncio
+
+    wikipedia = FakeWikipediaTool(pages={"Taiwan": "Taiwan is an island country in East Asia."}, latency=args.tool_latency)
+    model = FakeChatModel(tool_call={"name": wikipedia.name, "args": {"query": "Taiwan"}}, latency=args.llm_latency, token_rate=args.token_rate)
+
+    with bench.stage("compile") as stage:
+        # The lc_langgraph graph itself, with the stand-ins in place of Azure and Wikipedia
+        app = build_app(CompactSqliteSaver(":memory:"), model_factory=lambda: model, tools_node=create_concurrent_tool_node([wikipedia]))
+        stage["items"] = 1
+    with bench.stage("invoke") as stage:
+        for i in range(args.questions):
+            app.invoke({"messages": [HumanMessage(content="who is the president of taiwan?")]}, config={"configurable": {"thread_id": f"bench-{i}"}})
+        stage["items"] = args.questions
+    with bench.stage("stream") as stage:
+        _, metrics = asyncio.run(astream_graph(app, {"messages": [HumanMessage(content="who is the president of taiwan?")]},
+                                               config={"configurable": {"thread_id": "bench-stream"}}, on_token=lambda text: None))
+        stage["items"] = metrics["tokens"]
+    bench.rows[-1]["ttft_seconds"] = metrics["ttft_seconds"]
+
+def bench_pandas_df(bench: Bench, args):
+    import pandas as pd
+    from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+    from lc_fake import FakeChatModel
+
+    model = FakeChatModel(default_response="Final Answer: 891", latency=args.llm_latency, token_rate=args.token_rate)
+    with bench.stage("load") as stage:
+        df = pd.read_csv("./data/titanic.csv")
+        stage["items"] = len(df)
+    with bench.stage("query") as stage:
+        agent = create_pandas_dataframe_agent(model, df, allow_dangerous_code=True)
+        for _ in range(args.questions):
+            agent.invoke("how many rows are there?")
+        stage["items"] = args.questions
+
+BENCHMARKS = {"rag": bench_rag, "pdf": bench_pdf, "sqlite": bench_sqlite, "langgraph": bench_langgraph, "pandas_df": bench_pandas_df}
+
+def run_pipeline(pipeline: str, args, run_info: dict) -> list:
+    bench = Bench(pipeline, run_info)
+    try:
+        BENCHMARKS[pipeline](bench, args)
+    except ImportError as e:
+        # A pipeline whose dependencies are not installed is reported, not fatal
+        bench.rows.append({**run_info, "pipeline": pipeline, "stage": None, "error": f"missing dependency: {e.name or e}"})
+    except Exception as e:
+        bench.rows.append({**run_info, "pipeline": pipeline, "stage": None, "error": f"{type(e).__name__}: {e}"})
+    return bench.rows
+
+# Each pipeline runs in a fresh (spawned) interpreter, so its memory figures and its
+# imports, caches and pools are not inherited from the pipelines benchmarked before it
+def run(pipelines, args) -> list:
+    run_info = {"commit": current_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "llm_latency": args.llm_latency, "token_rate": args.token_rate, "store": args.store}
+    rows = []
+    for pipeline in pipelines:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            rows.extend(executor.submit(run_pipeline, pipeline, args, run_info).result())
+    return rows
+
+# Print per-stage wall time against a previous results file
+def compare(rows: list, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+        baseline = {(row["pipeline"], row["stage"]): row for row in map(json.loads, baseline_file) if row.get("stage")}
+    for row in rows:
+        before = baseline.get((row["pipeline"], row.get("stage")))
+        if before is None or "seconds" not in row:
+            continue
+        ratio = row["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        print(f'{row["pipeline"]:>10} {row["stage"]:<8} {before["seconds"]:8.3f}s -> {row["seconds"]:8.3f}s  x{ratio:.2f}', file=sys.stderr)
+
+def main():
+    try:
+        parser = argparse.ArgumentParser(description="Benchmark the lc_* pipelines against local stand-ins.")
+        parser.add_argument("pipelines", nargs="*", default=list(PIPELINES), help=f"any of {', '.join(PIPELINES)} (default: all)")
+        parser.add_argument("--llm-latency", type=float, default=0.2, help="fake chat model time to first token (s)")
+        parser.add_argument("--token-rate", type=float, default=50.0, help="fake chat model tokens per second")
+        parser.add_argument("--embed-latency", type=float, default=0.05, help="fake embedding round trip (s)")
+        parser.add_argument("--embed-concurrency", type=int, default=4, help="requests the embedding server takes before 429")
+        parser.add_argument("--doc-latency", type=float, default=0.1, help="fake document server latency (s)")
+        parser.add_argument("--tool-latency", type=float, default=0.2, help="fake Wikipedia tool latency (s)")
+        parser.add_argument("--paragraphs", type=int, default=200, help="paragraphs in the fake blog post")
+        parser.add_argument("--store", choices=("chroma", "float32", "float16", "int8"), default="chroma", help="vector store: Chroma or NumpyVectorStore of this dtype")
+        parser.add_argument("--questions", type=int, default=3, help="queries per pipeline")
+        parser.add_argument("--output", help="append JSON lines here instead of printing them")
+        parser.add_argument("--compare", help="JSON lines file of an earlier run to compare against")
+        args = parser.parse_args()
+        unknown = [name for name in args.pipelines if name not in BENCHMARKS]
+        if unknown:
+            raise ValueError(f"Unknown pipeline(s): {', '.join(unknown)}")
+
+        rows = run(args.pipelines, args)
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as output_file:
+                output_file.write(lines)
+        else:
+            sys.stdout.write(lines)
+        if args.compare:
+            compare(rows, args.compare)
+
+    except ValueError as ve:
+        return str(ve)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# Durable, compacting LangGraph checkpointer: SQLite (WAL) with deduplicated message storage
+import os, json, zlib, asyncio, hashlib, sqlite3, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointTuple
+
+# Checkpointer for long threads. Each message of the `message_channels` is serialized
+# once, compressed and stored by content hash; a checkpoint row only keeps the rest of
+# the state (compressed) plus its message references, written as a delta against the
+# parent checkpoint (prefix length + new hashes) with a full list every `snapshot_every`
+# checkpoints to bound reconstruction. So a put costs roughly the new messages, not the
+# whole history. Only the newest `keep_last` checkpoints of a thread are kept (None keeps all).
+class CompactSqliteSaver(BaseCheckpointSaver):
+    def __init__(self, path: str, keep_last: Optional[int] = 20, snapshot_every: int = 16, gc_every: int = 50,
+                 message_channels: Sequence[str] = ("messages",), **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.keep_last = keep_last
+        self.snapshot_every = snapshot_every
+        self.gc_every = gc_every
+        self.message_channels = tuple(message_channels)
+        self._puts = 0
+        self._digests = OrderedDict()
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL, thread_ts TEXT NOT NULL, parent_ts TEXT,
+                depth INTEGER NOT NULL, checkpoint BLOB NOT NULL, refs TEXT NOT NULL, metadata BLOB,
+                PRIMARY KEY (thread_id, thread_ts));
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL, hash TEXT NOT NULL, data BLOB NOT NULL,
+                PRIMARY KEY (thread_id, hash));
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL, thread_ts TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL,
+                channel TEXT NOT NULL, value BLOB,
+                PRIMARY KEY (thread_id, thread_ts, task_id, idx));
+            """
+        )
+        self.conn.commit()
+
+    @classmethod
+    def from_conn_string(cls, conn_string: str, **kwargs) -> "CompactSqliteSaver":
+        return cls(conn_string, **kwargs)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    def _pack(self, obj: Any) -> bytes:
+        return zlib.compress(self.serde.dumps(obj))
+
+    def _unpack(self, data: Optional[bytes]) -> Any:
+        return self.serde.loads(zlib.decompress(data)) if data is not None else None
+
+    # Hash of a message's packed form. Graph steps hand the same message objects from one
+    # checkpoint to the next, so digests are memoized per object and unchanged messages
+    # are not re-serialized on every put. Returns the packed bytes only when newly computed;
+    # the memo is shared by all threads, so a memoized hash says nothing about whether the
+    # blob is stored for the thread at hand (see _missing_blobs).
+    def _digest(self, value: Any) -> Tuple[str, Optional[bytes]]:
+        cached = self._digests.get(id(value))
+        if cached is not None and cached[0] is value:
+            self._digests.move_to_end(id(value))
+            return cached[1], None
+        data = self._pack(value)
+        digest = hashlib.sha256(data).hexdigest()
+        self._digests[id(value)] = (value, digest)
+        while len(self._digests) > 10000:
+            self._digests.popitem(last=False)
+        return digest, data
+
+    # Hashes among `digests` that have no blob stored for the thread yet
+    def _missing_blobs(self, conn, thread_id: str, digests: List[str]) -> List[str]:
+        stored = set()
+        for i in range(0, len(digests), 500):
+            part = digests[i:i + 500]
+            stored.update(row[0] for row in conn.execute(
+                f"SELECT hash FROM blobs WHERE thread_id = ? AND hash IN ({','.join('?' * len(part))})", [thread_id, *part]
+            ).fetchall())
+        return [digest for digest in digests if digest not in stored]
+
+    # ---- message references -------------------------------------------------
+
+    # Resolve a refs record ({channel: ["full", hashes] | ["delta", prefix_len, new_hashes]}) to full hash lists
+    def _resolve_refs(self, thread_id: str, refs: dict, parent_ts: Optional[str]) -> dict:
+        resolved, parent = {}, None
+        for channel, entry in refs.items():
+            if entry[0] == "full":
+                resolved[channel] = entry[1]
+                continue
+            if parent is None:
+                parent_row = self.conn.execute(
+                    "SELECT refs, parent_ts FROM checkpoints WHERE thread_id = ? AND thread_ts = ?", (thread_id, parent_ts)
+                ).fetchone()
+                parent = self._resolve_refs(thread_id, json.loads(parent_row[0]), parent_row[1])
+            resolved[channel] = parent.get(channel, [])[:entry[1]] + entry[2]
+        return resolved
+
+    def _load_messages(self, thread_id: str, hashes: List[str]) -> list:
+        blobs = {}
+        unique = list(set(hashes))
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, data FROM blobs WHERE thread_id = ? AND hash IN ({','.join('?' * len(part))})",
+                [thread_id, *part],
+            ).fetchall()
+            blobs.update(rows)
+        return [self._unpack(blobs[digest]) for digest in hashes]
+
+    # ---- reads --------------------------------------------------------------
+
+    def _tuple_from_row(self, thread_id: str, row: tuple) -> CheckpointTuple:
+        thread_ts, parent_ts, _, checkpoint_blob, refs, metadata = row
+        checkpoint = self._unpack(checkpoint_blob)
+        resolved = self._resolve_refs(thread_id, json.loads(refs), parent_ts)
+        for channel, hashes in resolved.items():
+            checkpoint["channel_values"][channel] = self._load_messages(thread_id, hashes)
+        config = {"configurable": {"thread_id": thread_id, "thread_ts": thread_ts}}
+        parent_config = {"configurable": {"thread_id": thread_id, "thread_ts": parent_ts}} if parent_ts else None
+        fields = [config, checkpoint, self._unpack(metadata), parent_config]
+        if "pending_writes" in getattr(CheckpointTuple, "_fields", ()):
+            writes = self.conn.execute(
+                "SELECT task_id, channel, value FROM writes WHERE thread_id = ? AND thread_ts = ? ORDER BY task_id, idx",
+                (thread_id, thread_ts),
+            ).fetchall()
+            fields.append([(task_id, channel, self._unpack(value)) for task_id, channel, value in writes])
+        return CheckpointTuple(*fields)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        thread_ts = configurable.get("thread_ts") or configurable.get("checkpoint_id")
+        columns = "thread_ts, parent_ts, depth, checkpoint, refs, metadata"
+        with self._lock:
+            if thread_ts:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND thread_ts = ?", (thread_id, thread_ts)
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? ORDER BY thread_ts DESC LIMIT 1", (thread_id,)
+                ).fetchone()
+            return self._tuple_from_row(thread_id, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None, before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, thread_ts, parent_ts, depth, checkpoint, refs, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+        if before is not None:
+            clauses.append("thread_ts < ?")
+            params.append(before["configurable"].get("thread_ts") or before["configurable"].get("checkpoint_id"))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY thread_ts DESC"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        count = 0
+        for row in rows:
+            with self._lock:
+                item = self._tuple_from_row(row[0], row[1:])
+            if filter and not all((item.metadata or {}).get(key) == value for key, value in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    # ---- writes -------------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: Any = None, new_versions: Any = None) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        parent_ts = config["configurable"].get("thread_ts") or config["configurable"].get("checkpoint_id")
+        thread_ts = checkpoint.get("id") or checkpoint["ts"]
+
+        state = dict(checkpoint)
+        channel_values = dict(state.get("channel_values", {}))
+        messages = {channel: channel_values.pop(channel) for channel in self.message_channels if isinstance(channel_values.get(channel), list)}
+        state["channel_values"] = channel_values
+
+        with self._transaction() as conn:
+            parent = conn.execute(
+                "SELECT refs, parent_ts, depth FROM checkpoints WHERE thread_id = ? AND thread_ts = ?", (thread_id, parent_ts)
+            ).fetchone() if parent_ts else None
+            depth = parent[2] + 1 if parent else 0
+            snapshot = parent is None or depth % self.snapshot_every == 0
+            parent_hashes = self._resolve_refs(thread_id, json.loads(parent[0]), parent[1]) if parent and not snapshot else {}
+
+            refs, new_blobs, memoized = {}, {}, {}
+            for channel, values in messages.items():
+                hashes = []
+                for value in values:
+                    digest, data = self._digest(value)
+                    hashes.append(digest)
+                    if data is not None:
+                        new_blobs[digest] = data
+                    else:
+                        memoized[digest] = value
+                if snapshot:
+                    refs[channel] = ["full", hashes]
+                    continue
+                # Length of the common prefix with the parent's list; only the rest is stored
+                previous = parent_hashes.get(channel, [])
+                prefix = 0
+                while prefix < min(len(previous), len(hashes)) and previous[prefix] == hashes[prefix]:
+                    prefix += 1
+                refs[channel] = ["delta", prefix, hashes[prefix:]]
+                for digest in hashes[:prefix]:
+                    new_blobs.pop(digest, None)
+                    memoized.pop(digest, None)
+
+            # Memoized messages may have been stored for another thread only, or collected since
+            memoized = {digest: value for digest, value in memoized.items() if digest not in new_blobs}
+            for digest in self._missing_blobs(conn, thread_id, list(memoized)):
+                new_blobs[digest] = self._pack(memoized[digest])
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (thread_id, hash, data) VALUES (?, ?, ?)",
+                [(thread_id, digest, data) for digest, data in new_blobs.items()],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, thread_ts, parent_ts, depth, checkpoint, refs, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, thread_ts, parent_ts, depth, self._pack(state), json.dumps(refs), self._pack(metadata)),
+            )
+            self._puts += 1
+            if self.keep_last is not None:
+                self._prune(conn, thread_id)
+        return {"configurable": {"thread_id": thread_id, "thread_ts": thread_ts}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        thread_ts = config["configurable"].get("thread_ts") or config["configurable"].get("checkpoint_id")
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, thread_ts, task_id, idx, channel, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(thread_id, thread_ts, task_id, idx, channel, self._pack(value)) for idx, (channel, value) in enumerate(writes)],
+            )
+
+    # Keep the newest `keep_last` checkpoints; kept deltas whose parent goes away are rewritten in full
+    def _prune(self, conn, thread_id: str):
+        stale = [row[0] for row in conn.execute(
+            "SELECT thread_ts FROM checkpoints WHERE thread_id = ? ORDER BY thread_ts DESC LIMIT -1 OFFSET ?", (thread_id, self.keep_last)
+        ).fetchall()]
+        if not stale:
+            return
+        stale_set = set(stale)
+        kept = conn.execute(
+            "SELECT thread_ts, parent_ts, refs FROM checkpoints WHERE thread_id = ? ORDER BY thread_ts", (thread_id,)
+        ).fetchall()
+        for thread_ts, parent_ts, refs in kept:
+            if thread_ts in stale_set or parent_ts not in stale_set:
+                continue
+            refs = json.loads(refs)
+            if any(entry[0] == "delta" for entry in refs.values()):
+                full = self._resolve_refs(thread_id, refs, parent_ts)
+                conn.execute(
+                    "UPDATE checkpoints SET refs = ? WHERE thread_id = ? AND thread_ts = ?",
+                    (json.dumps({channel: ["full", hashes] for channel, hashes in full.items()}), thread_id, thread_ts),
+                )
+        for i in range(0, len(stale), 500):
+            part = stale[i:i + 500]
+            marks = ",".join("?" * len(part))
+            conn.execute(f"DELETE FROM checkpoints WHERE thread_id = ? AND thread_ts IN ({marks})", [thread_id, *part])
+            conn.execute(f"DELETE FROM writes WHERE thread_id = ? AND thread_ts IN ({marks})", [thread_id, *part])
+        if self._puts % self.gc_every == 0:
+            self._collect_blobs(conn, thread_id)
+
+    # Drop message blobs no longer referenced by any remaining checkpoint of the thread
+    def _collect_blobs(self, conn, thread_id: str):
+        live = set()
+        for thread_ts, parent_ts, refs in conn.execute(
+            "SELECT thread_ts, parent_ts, refs FROM checkpoints WHERE thread_id = ?", (thread_id,)
+        ).fetchall():
+            for hashes in self._resolve_refs(thread_id, json.loads(refs), parent_ts).values():
+                live.update(hashes)
+        dead = [row[0] for row in conn.execute("SELECT hash FROM blobs WHERE thread_id = ?", (thread_id,)).fetchall() if row[0] not in live]
+        conn.executemany("DELETE FROM blobs WHERE thread_id = ? AND hash = ?", [(thread_id, digest) for digest in dead])
+
+    # ---- async --------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None, before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None):
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: Any = None, new_versions: Any = None) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id)
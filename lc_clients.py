@@ -0,0 +1,155 @@
+# Process-wide Azure OpenAI clients: param.json is read once and every model shares one HTTP connection pool
+import json, asyncio, weakref, threading
+from typing import NamedTuple
+import httpx
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+
+DEFAULT_PARAM_PATH = "param.json"
+# Value the README asks users to replace
+PLACEHOLDER = "Please, do it by yourself"
+
+class AzureSettings(NamedTuple):
+    apikey: str
+    apibase: str
+    apitype: str
+    apiversion: str
+    gptx_deployment: str
+    embd_deployment: str
+
+_lock = threading.Lock()
+_settings = {}
+_http_client = None
+_http_async_client = None
+_models = {}
+
+# Reads and validates param.json on first use; later calls return the same settings.
+# Raises ValueError for a missing file, missing keys or values left as the placeholder.
+def load_settings(path: str = DEFAULT_PARAM_PATH) -> AzureSettings:
+    with _lock:
+        if path not in _settings:
+            try:
+                with open(path, 'r', encoding='utf-8') as param_file:
+                    param_data = json.load(param_file)
+            except FileNotFoundError:
+                raise ValueError(f"{path} not found; see README.md for its format")
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} is not valid JSON: {e}")
+            fields = {field: param_data.get(f"azure_{field}") for field in AzureSettings._fields}
+            invalid = [f"azure_{field}" for field, value in fields.items() if not isinstance(value, str) or not value.strip() or value == PLACEHOLDER]
+            if invalid:
+                raise ValueError(f"{path}: missing or unset {', '.join(invalid)}")
+            _settings[path] = AzureSettings(**fields)
+        return _settings[path]
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+# Shared keep-alive pools, so building a chain again does not pay for a new TLS handshake
+def http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(limits=_limits(), timeout=httpx.Timeout(60.0, connect=10.0))
+        return _http_client
+
+# Async connections belong to the event loop that opened them, and each asyncio.run() starts
+# a new loop. This transport keeps one keep-alive pool per running loop, so the shared
+# AsyncClient (and the OpenAI clients built on it) work from any loop; a closed loop's pool is dropped.
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    def __init__(self):
+        self._transports = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [other for other in self._transports if other.is_closed()]:
+                del self._transports[stale]
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=_limits())
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    # Closes the running loop's pool; the pools of other loops can only be closed from those loops
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+def http_async_client() -> httpx.AsyncClient:
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None or _http_async_client.is_closed:
+            _http_async_client = httpx.AsyncClient(transport=_PerLoopTransport(), timeout=httpx.Timeout(60.0, connect=10.0))
+        return _http_async_client
+
+def _key(kind: str, kwargs: dict) -> tuple:
+    # Unhashable arguments (dicts, lists) are keyed by identity
+    items = []
+    for name, value in sorted(kwargs.items()):
+        try:
+            hash(value)
+        except TypeError:
+            value = ("id", id(value))
+        items.append((name, value))
+    return (kind, tuple(items))
+
+def _shared(kind: str, factory, kwargs: dict):
+    key = _key(kind, kwargs)
+    with _lock:
+        model = _models.get(key)
+    if model is None:
+        model = factory(**kwargs)
+        with _lock:
+            model = _models.setdefault(key, model)
+    return model
+
+# AzureChatOpenAI on the shared pools. Calls with the same arguments return the same
+# instance, so its sync and async OpenAI clients are built once per process.
+def chat_model(temperature: float = 0, path: str = DEFAULT_PARAM_PATH, **kwargs) -> AzureChatOpenAI:
+    settings = load_settings(path)
+
+    def factory(**kwargs):
+        return AzureChatOpenAI(
+            deployment_name=settings.gptx_deployment,
+            openai_api_version=settings.apiversion,
+            openai_api_key=settings.apikey,
+            azure_endpoint=settings.apibase,
+            http_client=http_client(),
+            http_async_client=http_async_client(),
+            **kwargs,
+        )
+    return _shared(f"chat:{path}", factory, {"temperature": temperature, **kwargs})
+
+# AzureOpenAIEmbeddings on the shared pools, shared per argument set like chat_model
+def embeddings(path: str = DEFAULT_PARAM_PATH, **kwargs) -> AzureOpenAIEmbeddings:
+    settings = load_settings(path)
+
+    def factory(**kwargs):
+        return AzureOpenAIEmbeddings(
+            deployment=settings.embd_deployment,
+            openai_api_key=settings.apikey,
+            openai_api_version=settings.apiversion,
+            openai_api_type=settings.apitype,
+            azure_endpoint=settings.apibase,
+            http_client=http_client(),
+            http_async_client=http_async_client(),
+            **kwargs,
+        )
+    return _shared(f"embed:{path}", factory, kwargs)
+
+# Closes the shared pools; the next client handed out opens new ones
+def close():
+    global _http_client, _http_async_client
+    with _lock:
+        _models.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+        # Async pools are closed by their event loops (`await client.aclose()`); here they are only dropped
+        _http_async_client = None
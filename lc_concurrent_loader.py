@@ -0,0 +1,137 @@
+# Concurrent document loading with per-source timeouts, failure reporting and a disk cache
+import os, json, queue, asyncio, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+
+# Loads many sources (e.g. YouTube URLs) with `load_fn(source) -> List[Document]`.
+# At most `max_concurrency` sources are fetched at once and each gets `timeout`
+# seconds once it starts. load() returns the results in source order; stream() hands
+# them over as they arrive. Sources that fail or time out are reported in `failures`
+# instead of aborting the whole run.
+# With `cache_dir` set, fetched documents are stored as JSON and re-runs skip the network.
+class ConcurrentLoader:
+    def __init__(self, load_fn: Callable[[str], List[Document]], max_concurrency: int = 4, timeout: float = 60.0, cache_dir: Optional[str] = None):
+        self.load_fn = load_fn
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_hits = 0
+        self.fetched = 0
+
+    def _cache_path(self, source: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(source.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_cache(self, source: str) -> Optional[List[Document]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(source), "r", encoding="utf-8") as cache_file:
+                return [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in json.load(cache_file)]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, source: str, docs: List[Document]):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temp file first so an interrupted run never leaves a truncated entry
+        path = self._cache_path(source)
+        with open(path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs], cache_file, ensure_ascii=False, default=str)
+        os.replace(path + ".tmp", path)
+
+    async def _load_one(self, source: str, semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor) -> List[Document]:
+        docs = self._read_cache(source)
+        if docs is not None:
+            self.cache_hits += 1
+            return docs
+        async with semaphore:
+            # The blocking loader runs in a worker thread; on timeout its result is abandoned
+            future = asyncio.get_running_loop().run_in_executor(executor, self.load_fn, source)
+            docs = await asyncio.wait_for(future, self.timeout)
+        self.fetched += 1
+        self._write_cache(source, docs)
+        return docs
+
+    def _failure(self, error: BaseException) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return f"timed out after {self.timeout}s"
+        return f"{type(error).__name__}: {error}"
+
+    async def aload(self, sources: List[str]) -> Tuple[List[Document], Dict[str, str]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # A private pool, so threads stuck on timed-out sources neither take slots from
+        # the remaining sources nor hold up the return (threads are only spawned on demand)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(sources)))
+        try:
+            results = await asyncio.gather(*(self._load_one(source, semaphore, executor) for source in sources), return_exceptions=True)
+        finally:
+            executor.shutdown(wait=False)
+        docs, failures = [], {}
+        for source, result in zip(sources, results):
+            if isinstance(result, BaseException):
+                failures[source] = self._failure(result)
+            else:
+                docs.extend(result)
+        return docs, failures
+
+    def load(self, sources: List[str]) -> Tuple[List[Document], Dict[str, str]]:
+        return asyncio.run(self.aload(sources))
+
+    # Yields each source's documents as soon as that source has loaded (completion order),
+    # so they can be split and indexed while slower sources are still being fetched.
+    # Failed sources are added to `failures`. A source keeps its slot until its documents
+    # have been taken, so a slow consumer holds back loading instead of letting loaded
+    # transcripts pile up: at most `max_concurrency` sources are in memory at once.
+    def stream(self, sources: List[str], failures: Optional[Dict[str, str]] = None) -> Iterator[Document]:
+        failures = {} if failures is None else failures
+        results = queue.Queue(maxsize=1)
+        stopped = threading.Event()
+        done = object()
+
+        def hand_over(item):
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        async def produce():
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            window = asyncio.Semaphore(self.max_concurrency)
+            executor = ThreadPoolExecutor(max_workers=max(1, len(sources)))
+
+            async def one(source: str):
+                async with window:
+                    try:
+                        docs = await self._load_one(source, semaphore, executor)
+                    except Exception as e:
+                        failures[source] = self._failure(e)
+                        return
+                    await asyncio.to_thread(hand_over, docs)
+            try:
+                await asyncio.gather(*(one(source) for source in sources))
+            finally:
+                executor.shutdown(wait=False)
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except BaseException as e:
+                hand_over(e)
+            hand_over(done)
+
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            # Also reached when the consumer stops early; pending hand-overs give up
+            stopped.set()
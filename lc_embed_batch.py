@@ -0,0 +1,173 @@
+# Concurrent, rate-limit-aware batch embedding engine for ingestion
+import sys, time, random, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from langchain_core.embeddings import Embeddings
+
+# Rough token count without a tokenizer: ~4 ASCII characters per token, one token per CJK character
+def approx_tokens(text: str) -> int:
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars) + 1
+
+# Pack texts, in order, into batches that stay under both a token budget and an item cap.
+# A single text larger than the budget still gets a batch of its own.
+def pack_batches(texts: List[str], max_tokens: int = 8000, max_items: int = 256, count_tokens: Callable[[str], int] = approx_tokens) -> List[List[str]]:
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def is_rate_limited(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError"
+
+# Failures worth another attempt, as the OpenAI SDK's own retries judge them: timeouts,
+# conflicts and 5xx responses, and errors that never got a response at all
+def is_transient(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+def retry_after(exc: Exception) -> Optional[float]:
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+# AIMD concurrency limit: halved on every 429, grows back by about one slot per
+# window of successful requests, never above `max_concurrency`.
+class AdaptiveLimiter:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, throttled: Optional[bool] = None):
+        with self._cond:
+            self.active -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            elif throttled is not None:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+# Wraps an Embeddings client: packs texts into token-budgeted batches, sends them
+# concurrently under an adaptive limit, backs off on 429 and returns vectors in input order.
+# Transient errors (5xx, timeouts, dropped connections) are retried with the same backoff
+# but leave the limit alone, so the client can be built with its own retries off
+# (embeddings(max_retries=0)) without losing them.
+class ConcurrentEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, max_concurrency: int = 4, max_tokens: int = 8000, max_items: int = 256,
+                 max_retries: int = 8, base_backoff: float = 0.5, max_backoff: float = 30.0, count_tokens: Callable[[str], int] = approx_tokens):
+        self.embeddings = embeddings
+        # Exposed so CachedEmbeddings can namespace by the real deployment
+        self.deployment = getattr(embeddings, "deployment", None)
+        self.max_concurrency = max_concurrency
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.count_tokens = count_tokens
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.batches = 0
+        self.throttled = 0
+        self.transient = 0
+        # Batches run on pool threads, and concurrent embed_documents calls share the counters
+        self._lock = threading.Lock()
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                vectors = self.embeddings.embed_documents(batch)
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                if not (throttled or is_transient(e)) or attempt >= self.max_retries:
+                    self.limiter.release()
+                    raise
+                self.limiter.release(throttled=throttled or None)
+                with self._lock:
+                    if throttled:
+                        self.throttled += 1
+                    else:
+                        self.transient += 1
+                # Honour Retry-After when the service sends it, otherwise exponential backoff with jitter
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.limiter.release(throttled=False)
+            with self._lock:
+                self.batches += 1
+            return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = pack_batches(texts, self.max_tokens, self.max_items, self.count_tokens)
+        if len(batches) <= 1:
+            return [vector for batch in batches for vector in self._embed_batch(batch)]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            # map() yields in submission order, which keeps the output deterministic
+            results = list(pool.map(self._embed_batch, batches))
+        return [vector for vectors in results for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self.batches, "retries": self.throttled, "transient_retries": self.transient, "limit": self.limiter.limit}
+
+def main():
+    try:
+        print("Hello, Batch Embedding!")
+
+        from lc_fake import FakeEmbeddingServer, FakeEmbeddingClient
+
+        run_option = 0
+        match run_option:
+            case 0:
+                # Serial vs concurrent ingestion against a throttling local server
+                texts = [f"chunk {i} " + "lorem ipsum " * (i % 50) for i in range(400)]
+                with FakeEmbeddingServer(latency=0.05, max_concurrent=6) as server:
+                    client = FakeEmbeddingClient(server.url)
+
+                    start = time.perf_counter()
+                    serial = [vector for batch in pack_batches(texts, max_items=16) for vector in client.embed_documents(batch)]
+                    print(f"serial:     {time.perf_counter() - start:.2f}s")
+
+                    engine = ConcurrentEmbeddings(client, max_concurrency=8, max_items=16, base_backoff=0.05)
+                    start = time.perf_counter()
+                    concurrent = engine.embed_documents(texts)
+                    print(f"concurrent: {time.perf_counter() - start:.2f}s, batches={engine.batches}, throttled={engine.throttled}, limit={engine.limiter.limit:.1f}")
+                    print(f"same order: {serial == concurrent}")
+            case _:
+                print(f'Error: Wrong run_option({run_option})!')
+
+    except ValueError as ve:
+        return str(ve)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# Content-addressed embedding cache backed by a local SQLite file
+import os, hashlib, sqlite3, threading
+from array import array
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = "./cache/embeddings.sqlite"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# Wraps any Embeddings client. Vectors are keyed by (deployment, text hash);
+# only the cache misses of a call are sent to the real client, in one batch.
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, path: str = DEFAULT_CACHE_PATH, namespace: Optional[str] = None):
+        self.embeddings = embeddings
+        self.namespace = namespace or getattr(embeddings, "deployment", None) or getattr(embeddings, "model", "") or ""
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, hash))"
+        )
+        self._conn.commit()
+
+    def _lookup(self, hashes: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE namespace = ? AND hash IN ({','.join('?' * len(part))})",
+                    [self.namespace, *part],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, items: dict):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (namespace, hash, vector) VALUES (?, ?, ?)",
+                [(self.namespace, key, array("f", vector).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self._lookup(list(set(hashes)))
+
+        # Deduplicate the misses so repeated texts in one call are embedded once
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self._store(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        self._conn.close()
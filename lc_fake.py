@@ -0,0 +1,276 @@
+# Local stand-ins for remote services, so pipelines can be exercised offline
+import json, time, hashlib, threading, urllib.request, urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+
+# Deterministic pseudo-embedding: the same text always gives the same unit vector
+def fake_vector(text: str, dim: int = 8) -> List[float]:
+    digest = b""
+    counter = 0
+    while len(digest) < dim:
+        digest += hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        counter += 1
+    values = [b / 255.0 - 0.5 for b in digest[:dim]]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Embedding endpoint that simulates round-trip latency and throttles (HTTP 429)
+# whenever more than `max_concurrent` requests are in flight. The first `failures`
+# requests get an HTTP 503, like a service that is briefly unavailable.
+class FakeEmbeddingServer:
+    def __init__(self, latency: float = 0.05, per_item_latency: float = 0.0, max_concurrent: int = 4, retry_after: float = 0.05, dim: int = 8, host: str = "127.0.0.1", port: int = 0,
+                 failures: int = 0):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.dim = dim
+        self.requests = 0
+        self.throttled = 0
+        self.failures = failures
+        self.active = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    if server.failures > 0:
+                        server.failures -= 1
+                        status = 503
+                    elif server.active >= server.max_concurrent:
+                        server.throttled += 1
+                        status = 429
+                    else:
+                        server.active += 1
+                        status = 200
+                if status == 503:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if status == 429:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(server.retry_after))
+                    self.end_headers()
+                    return
+                try:
+                    texts = body.get("input", [])
+                    time.sleep(server.latency + server.per_item_latency * len(texts))
+                    data = [{"index": i, "embedding": fake_vector(text, server.dim)} for i, text in enumerate(texts)]
+                    payload = json.dumps({"data": data}).encode("utf-8")
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# Embeddings client for FakeEmbeddingServer; raises RateLimitError on HTTP 429
+class FakeEmbeddingClient(Embeddings):
+    def __init__(self, url: str, deployment: str = "fake-embedding", timeout: float = 30.0):
+        self.url = url
+        self.deployment = deployment
+        self.timeout = timeout
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        request = urllib.request.Request(
+            f"{self.url}/embeddings",
+            data=json.dumps({"input": list(texts)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = json.loads(response.read())["data"]
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After")
+                raise RateLimitError("Too Many Requests", float(retry_after) if retry_after else None) from None
+            raise
+        return [item["embedding"] for item in sorted(data, key=lambda item: item["index"])]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+# Loader stand-in that serves canned transcripts with simulated latency.
+# Sources in `failing` raise, sources in `hanging` sleep for `hang_seconds`.
+class FakeTranscriptLoader:
+    def __init__(self, transcripts: dict, latency: float = 0.05, failing: set = (), hanging: set = (), hang_seconds: float = 5.0):
+        self.transcripts = transcripts
+        self.latency = latency
+        self.failing = set(failing)
+        self.hanging = set(hanging)
+        self.hang_seconds = hang_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, source: str):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.hang_seconds if source in self.hanging else self.latency)
+        if source in self.failing or source not in self.transcripts:
+            raise ValueError(f"Transcript unavailable: {source}")
+        text, metadata = self.transcripts[source]
+        return [Document(page_content=text, metadata={"source": source, **metadata})]
+
+# Stand-in for WikipediaQueryRun: canned page summaries with simulated latency
+class FakeWikipediaTool(BaseTool):
+    name: str = "wikipedia"
+    description: str = (
+        "A wrapper around Wikipedia. Useful for when you need to answer general questions about "
+        "people, places, companies, facts, historical events, or other subjects. Input should be a search query."
+    )
+    pages: dict = {}
+    latency: float = 0.2
+    calls: int = 0
+
+    def _run(self, query: str, run_manager=None) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        for title, summary in self.pages.items():
+            if title.lower() in query.lower():
+                return f"Page: {title}\nSummary: {summary}"
+        return "No good Wikipedia Search Result was found"
+
+# Deterministic chat model with a configurable time to first token and token rate.
+# The reply is the value of the first `responses` key found in the prompt, else
+# `default_response`. With `tool_call` set, a turn that ends on a user message is
+# answered with that tool call instead, so agent graphs exercise their tools node.
+class FakeChatModel(BaseChatModel):
+    responses: dict = {}
+    default_response: str = "This is a deterministic answer from the fake chat model."
+    tool_call: Optional[dict] = None
+    latency: float = 0.2
+    token_rate: float = 50.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.tool_call is not None and isinstance(messages[-1], HumanMessage):
+            call = {"name": self.tool_call["name"], "args": self.tool_call.get("args", {}), "id": f"call_{self.calls}"}
+            return AIMessage(content="", tool_calls=[call])
+        prompt = "\n".join(str(message.content) for message in messages)
+        for key, reply in self.responses.items():
+            if key in prompt:
+                return AIMessage(content=reply)
+        return AIMessage(content=self.default_response)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        message = self._reply(messages)
+        time.sleep(self.latency + max(0, len(str(message.content).split()) - 1) / self.token_rate)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        message = self._reply(messages)
+        time.sleep(self.latency)
+        if not message.content:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0} for call in message.tool_calls
+            ]))
+            return
+        for i, word in enumerate(str(message.content).split(" ")):
+            if i:
+                time.sleep(1 / self.token_rate)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    # Tools are accepted for interface compatibility; calls come only from `tool_call`
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+# Serves a generated blog-style HTML page at /post, shaped like the page lc_rag loads
+class FakeDocumentServer:
+    def __init__(self, paragraphs: int = 200, latency: float = 0.1, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        body = "".join(
+            f"<p>Paragraph {i}. " + " ".join(f"term{(i * 7 + j) % 97}" for j in range(80)) + ".</p>" for i in range(paragraphs)
+        )
+        self.page = (
+            '<html><body><h1 class="post-title">Fake post</h1>'
+            f'<div class="post-header">Benchmark fixture</div><div class="post-content">{body}</div></body></html>'
+        ).encode("utf-8")
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(server.page)))
+                self.end_headers()
+                self.wfile.write(server.page)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,257 @@
+# Token-budgeted chat history compaction with a rolling, per-session summary
+import re, time, hashlib, threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable, RunnableBranch, RunnableConfig, RunnableLambda, RunnableParallel, RunnablePassthrough
+from lc_embed_batch import approx_tokens
+from lc_pipeline import split_id
+
+summarize_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system",
+         "Progressively summarize the conversation below, adding onto the previous summary. "
+         "Keep names, facts, decisions and open questions; drop small talk. "
+         "Return only the new summary.\n\n"
+         "Previous summary:\n{summary}"),
+        MessagesPlaceholder("messages"),
+    ]
+)
+
+def message_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(approx_tokens(str(message.content)) + 4 for message in messages)
+
+def _fingerprint(message: BaseMessage) -> str:
+    return hashlib.sha256(f"{message.type}\x00{message.content}".encode("utf-8")).hexdigest()
+
+# Keeps the most recent turns verbatim and folds older ones into a summary.
+# The verbatim tail may grow to `max_turns` turns / `max_tokens` tokens; once it
+# overflows, it is folded down to half of both, so the summarizer runs once every
+# few turns rather than on every turn. Summaries are cached per session together
+# with where they end in the history, and rebuilt if the history no longer matches.
+class HistoryCompactor:
+    def __init__(self, model, max_tokens: int = 1500, max_turns: int = 6, max_sessions: int = 1000, history_key: str = "chat_history"):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.history_key = history_key
+        self.summarizer = summarize_prompt | model | StrOutputParser()
+        self.summaries_made = 0
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _overflows(self, messages: Sequence[BaseMessage]) -> bool:
+        return len(messages) > 2 * self.max_turns or message_tokens(messages) > self.max_tokens
+
+    # Number of trailing messages that fit in half the turn and token budget (at least one)
+    def _tail_size(self, messages: Sequence[BaseMessage]) -> int:
+        size, tokens = 0, 0
+        for message in reversed(messages):
+            tokens += message_tokens([message])
+            if size and (size + 1 > self.max_turns or tokens > self.max_tokens // 2):
+                break
+            size += 1
+        # Start the tail on a user message so no answer is kept without its question
+        while size > 1 and messages[-size].type != "human":
+            size -= 1
+        return size
+
+    # The cached summary covers the history up to a boundary, remembered by the fingerprints
+    # of the last folded and the first kept message. The history store may have trimmed its
+    # head since (SessionStore keeps `max_messages`), so the boundary is searched for rather
+    # than taken as an index; if the folded messages were all trimmed away, the history now
+    # starts at the first kept message and the summary still covers everything before it.
+    def _cached(self, session_id: str, messages: Sequence[BaseMessage]) -> tuple:
+        with self._lock:
+            state = self._summaries.get(session_id)
+            if state is not None:
+                self._summaries.move_to_end(session_id)
+        if state is None:
+            return 0, ""
+        folded, last_folded, first_kept, summary = state
+        # Trimming only moves the boundary towards the start
+        for index in range(min(folded, len(messages) - 1) - 1, -1, -1):
+            if _fingerprint(messages[index]) == last_folded and _fingerprint(messages[index + 1]) == first_kept:
+                return index + 1, summary
+        if messages and _fingerprint(messages[0]) == first_kept:
+            return 0, summary
+        return 0, ""
+
+    # `config` is handed to the summarizer, so its LLM call shows up under the caller's run
+    # (callbacks, tags) and honours its limits
+    def compact(self, messages: Sequence[BaseMessage], session_id: str = "default", config: Optional[RunnableConfig] = None) -> List[BaseMessage]:
+        messages = list(messages)
+        folded, summary = self._cached(session_id, messages)
+        recent = messages[folded:]
+        to_fold = recent[:len(recent) - self._tail_size(recent)] if self._overflows(recent) else []
+        if to_fold:
+            summary = self.summarizer.invoke({"summary": summary or "(none)", "messages": to_fold}, config)
+            self.summaries_made += 1
+            folded += len(to_fold)
+            with self._lock:
+                self._summaries[session_id] = (folded, _fingerprint(messages[folded - 1]), _fingerprint(messages[folded]), summary)
+                self._summaries.move_to_end(session_id)
+                while len(self._summaries) > self.max_sessions:
+                    self._summaries.popitem(last=False)
+        if not summary:
+            return messages[folded:]
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + messages[folded:]
+
+    def _compact_input(self, input: dict, config: RunnableConfig) -> List[BaseMessage]:
+        session_id = (config or {}).get("configurable", {}).get("session_id", "default")
+        return self.compact(input.get(self.history_key, []), session_id, config)
+
+    # Runnable that replaces `history_key` in the input dict with the compacted history;
+    # put it in front of a chain that takes chat history
+    def as_runnable(self) -> Runnable:
+        return RunnablePassthrough.assign(**{self.history_key: RunnableLambda(self._compact_input)})
+
+# Cheap, LLM-free check of whether a follow-up question needs the chat history to be
+# understood. Questions with referring words (it, they, that one, 它, 這個, ...), elliptical
+# openers ("what about ...", "and ...", "...呢") or too few words to stand alone are
+# contextualized; everything else goes straight to the retriever. When unsure it errs
+# towards contextualizing, which only costs the call the router is trying to save.
+class ContextRouter:
+    REFERRING_WORDS = {
+        "it", "its", "itself", "they", "them", "their", "theirs", "this", "that", "these", "those",
+        "he", "him", "his", "she", "her", "hers", "one", "ones", "former", "latter", "same",
+        "such", "there", "then", "above", "previous", "earlier", "aforementioned", "else", "other", "others",
+    }
+    ELLIPSIS_OPENERS = ("and ", "but ", "or ", "so ", "also ", "what about", "how about", "what else", "why not", "then ")
+    CJK_REFERRING = ("它", "他們", "她們", "這個", "那個", "這些", "這種", "那種", "這項", "該條", "上述", "前述", "剛才", "剛剛", "以上")
+    CJK_ELLIPSIS_OPENERS = ("那", "還有", "另外", "然後", "而且", "那麼")
+
+    def __init__(self, min_words: int = 3):
+        self.min_words = min_words
+        self.skipped = 0
+        self.contextualized = 0
+        self.rephrase_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def needs_context(self, question: str) -> bool:
+        text = question.strip().lower()
+        words = re.findall(r"[a-z0-9']+", text)
+        cjk_chars = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+        if any(word in self.REFERRING_WORDS for word in words) or text.startswith(self.ELLIPSIS_OPENERS):
+            return True
+        if any(marker in text for marker in self.CJK_REFERRING) or text.startswith(self.CJK_ELLIPSIS_OPENERS):
+            return True
+        if text.rstrip("?？!！。. ").endswith("呢"):
+            return True
+        # Chinese has no spaces; count roughly two characters per word
+        return len(words) + cjk_chars // 2 < self.min_words
+
+    def route(self, input: dict) -> bool:
+        needed = self.needs_context(input["input"])
+        with self._lock:
+            if needed:
+                self.contextualized += 1
+            else:
+                self.skipped += 1
+        return needed
+
+    def record_rephrase(self, seconds: float):
+        with self._lock:
+            self.rephrase_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.skipped + self.contextualized
+            avg_rephrase = self.rephrase_seconds / self.contextualized if self.contextualized else 0.0
+            return {
+                "skipped": self.skipped,
+                "contextualized": self.contextualized,
+                "skip_rate": self.skipped / total if total else 0.0,
+                "avg_rephrase_seconds": avg_rephrase,
+                "estimated_seconds_saved": avg_rephrase * self.skipped,
+            }
+
+# Like langchain's create_history_aware_retriever, but asks `router` first and only
+# makes the rephrase LLM call for questions that depend on the chat history
+def create_routed_history_aware_retriever(llm, retriever, prompt, router: ContextRouter) -> Runnable:
+    contextualize = prompt | llm | StrOutputParser()
+
+    def rephrase(input: dict, config: RunnableConfig) -> str:
+        start = time.perf_counter()
+        question = contextualize.invoke(input, config)
+        router.record_rephrase(time.perf_counter() - start)
+        return question
+
+    return RunnableBranch(
+        (lambda x: not x.get("chat_history", False), (lambda x: x["input"]) | retriever),
+        (lambda x: not router.route(x), (lambda x: x["input"]) | retriever),
+        RunnableLambda(rephrase) | retriever,
+    ).with_config(run_name="chat_retriever_chain")
+
+def _terms(text: str) -> set:
+    text = text.lower()
+    cjk = [ch for ch in text if "\u4e00" <= ch <= "\u9fff"]
+    return set(re.findall(r"[a-z0-9]+", text)) | {a + b for a, b in zip(cjk, cjk[1:])}
+
+def question_similarity(a: str, b: str) -> float:
+    terms_a, terms_b = _terms(a), _terms(b)
+    if not terms_a and not terms_b:
+        return 1.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+# History-aware retrieval that starts retrieving with the raw question while the
+# rephrase call is still running. If the rephrased question is near-identical to the
+# raw one (term Jaccard >= `reuse_threshold`) the speculative results are used as is;
+# otherwise the rephrased question is retrieved too and the two sets are merged,
+# rephrased results first, duplicates removed, at most `max_docs` documents.
+# With a ContextRouter, standalone questions skip the rephrase entirely.
+class SpeculativeRetriever:
+    def __init__(self, llm, retriever, prompt, router: ContextRouter = None, reuse_threshold: float = 0.8, max_docs: int = 6):
+        self.retriever = retriever
+        self.contextualize = prompt | llm | StrOutputParser()
+        self.router = router
+        self.reuse_threshold = reuse_threshold
+        self.max_docs = max_docs
+        self.reused = 0
+        self.re_retrieved = 0
+        self._lock = threading.Lock()
+
+    def _merge(self, first, second) -> list:
+        merged, seen = [], set()
+        for doc in list(first) + list(second):
+            key = split_id(doc)
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+        return merged[:self.max_docs]
+
+    def _resolve(self, result: dict, config: RunnableConfig) -> list:
+        if question_similarity(result["input"], result["rephrased"]) >= self.reuse_threshold:
+            with self._lock:
+                self.reused += 1
+            return result["speculative"]
+        with self._lock:
+            self.re_retrieved += 1
+        return self._merge(self.retriever.invoke(result["rephrased"], config), result["speculative"])
+
+    # Times the rephrase call so the router's estimate of the time it saves stays meaningful
+    def _rephrase(self, input: dict, config: RunnableConfig) -> str:
+        start = time.perf_counter()
+        question = self.contextualize.invoke(input, config)
+        if self.router is not None:
+            self.router.record_rephrase(time.perf_counter() - start)
+        return question
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.reused + self.re_retrieved
+            return {"reused": self.reused, "re_retrieved": self.re_retrieved, "reuse_rate": self.reused / total if total else 0.0}
+
+    def as_runnable(self) -> Runnable:
+        raw_retrieval = (lambda x: x["input"]) | self.retriever
+        speculative = RunnableParallel(
+            input=lambda x: x["input"],
+            speculative=raw_retrieval,
+            rephrased=RunnableLambda(self._rephrase),
+        ) | RunnableLambda(self._resolve)
+        branches = [(lambda x: not x.get("chat_history", False), raw_retrieval)]
+        if self.router is not None:
+            branches.append((lambda x: not self.router.route(x), raw_retrieval))
+        return RunnableBranch(*branches, speculative).with_config(run_name="chat_retriever_chain")
@@ -0,0 +1,158 @@
+# Hybrid retrieval: a local BM25 inverted index (CJK-aware) fused with vector search
+import re, math, threading, unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.pydantic_v1 import Field, PrivateAttr
+from langchain_core.retrievers import BaseRetriever
+from lc_pipeline import split_id
+
+CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+CN_UNITS = {"十": 10, "百": 100, "千": 1000}
+# 第十二條, 第 12 條, 第八十四條之一 and, as in the official PDF, 第 84-1 條 (also 章/節/項/款)
+ARTICLE_RE = re.compile(r"第\s*([0-9零〇一二兩三四五六七八九十百千]+)(?:\s*-\s*([0-9]+))?\s*(條|章|節|項|款)(?:\s*之\s*([0-9一二三四五六七八九十]+))?")
+CJK_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+def chinese_number(text: str) -> int:
+    if text.isdigit():
+        return int(text)
+    total = digit = 0
+    for char in text:
+        if char in CN_DIGITS:
+            digit = CN_DIGITS[char]
+        elif char in CN_UNITS:
+            # A bare unit such as the 十 in 十二 counts as one
+            total += (digit or 1) * CN_UNITS[char]
+            digit = 0
+    return total + digit
+
+# Terms of `text`: one term per article reference ("條:12", "條:84-1") in whichever numeral
+# style it is written, character bigrams of the remaining CJK runs (a lone character is a
+# unigram) and lower-cased Latin words and numbers.
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+
+    def article(match) -> str:
+        term = f"{match.group(3)}:{chinese_number(match.group(1))}"
+        sub = match.group(2) or match.group(4)
+        if sub:
+            term += f"-{chinese_number(sub)}"
+        tokens.append(term)
+        return " "
+    text = ARTICLE_RE.sub(article, text)
+    for run in CJK_RE.findall(text):
+        tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    tokens.extend(WORD_RE.findall(CJK_RE.sub(" ", text)))
+    return tokens
+
+# Okapi BM25 over an in-memory inverted index (term -> {doc: term frequency})
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = []
+        self.lengths = []
+        self.postings = {}
+        self._ids = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc: Document):
+        doc_id = split_id(doc)
+        terms = Counter(tokenize(doc.page_content))
+        with self._lock:
+            if doc_id in self._ids:
+                return
+            index = self._ids[doc_id] = len(self.docs)
+            self.docs.append(doc)
+            length = sum(terms.values())
+            self.lengths.append(length)
+            self._total_length += length
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[index] = tf
+
+    def add_documents(self, docs: Iterable[Document]):
+        for doc in docs:
+            self.add(doc)
+
+    # Pass-through that indexes documents as they stream by, e.g. between split_stream and upsert_stream
+    def index_stream(self, docs: Iterable[Document]) -> Iterator[Document]:
+        for doc in docs:
+            self.add(doc)
+            yield doc
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    # Top-k (document index, score, coverage, rarest matched IDF) for `query`. Coverage is the
+    # share of the IDF mass of the query's indexed terms that the document contains; terms
+    # the corpus never uses (often bigrams spanning two words) are left out of it.
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float, float, float]]:
+        terms = Counter(tokenize(query))
+        with self._lock:
+            if not terms or not self.docs:
+                return []
+            average = self._total_length / len(self.docs)
+            idfs = {term: self.idf(term) for term in terms if term in self.postings}
+            known_idf = sum(idfs[term] * terms[term] for term in idfs)
+            scores, matched, rarest = {}, {}, {}
+            for term, idf in idfs.items():
+                for index, tf in self.postings[term].items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[index] / average)
+                    scores[index] = scores.get(index, 0.0) + terms[term] * idf * tf * (self.k1 + 1) / norm
+                    matched[index] = matched.get(index, 0.0) + terms[term] * idf
+                    rarest[index] = max(rarest.get(index, 0.0), idf)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(index, scores[index], matched[index] / known_idf, rarest[index]) for index in ranked]
+
+# Reciprocal rank fusion of several ranked lists, keyed by split_id
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            doc_id = split_id(doc)
+            docs.setdefault(doc_id, doc)
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return [docs[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)]
+
+# BM25 and vector search fused with reciprocal rank fusion. When the lexical match is
+# decisive the BM25 ranking is returned as is and the query is never embedded, which saves
+# the remote call. Decisive means the best BM25 hit contains at least `decisive_coverage`
+# of the query's indexed terms, one of them rare (IDF >= `min_idf`): an exact article
+# number or legal term such as 第十二條 or 資遣費, not just words every article uses.
+class HybridRetriever(BaseRetriever):
+    vectorstore: Any
+    index: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    decisive_coverage: float = 0.8
+    min_idf: float = 2.0
+    counts: Dict[str, int] = Field(default_factory=lambda: {"lexical_only": 0, "hybrid": 0})
+    # Retrievers are shared by concurrent requests (lc_server, batch)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        hits = self.index.search(query, self.fetch_k)
+        lexical = [self.index.docs[hit[0]] for hit in hits]
+        if hits and hits[0][2] >= self.decisive_coverage and hits[0][3] >= self.min_idf:
+            with self._lock:
+                self.counts["lexical_only"] += 1
+            return lexical[:self.k]
+        with self._lock:
+            self.counts["hybrid"] += 1
+        vector = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        return reciprocal_rank_fusion([lexical, vector], self.rrf_k)[:self.k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        total = counts["lexical_only"] + counts["hybrid"]
+        return {**counts, "embedding_calls_saved": counts["lexical_only"] / total if total else 0.0}
@@ -0,0 +1,11 @@
+# Persistent, incrementally updated Chroma index
+from langchain_chroma import Chroma
+from lc_pipeline import upsert_stream
+
+# Open (or create) an on-disk collection and bring it in line with `splits`:
+# only new or changed splits are embedded, splits that no longer exist are deleted.
+# `splits` may be any iterable, including a split_stream() generator.
+def sync_chroma(splits, embed, persist_directory: str, collection_name: str = "langchain", **kwargs):
+    vectorstore = Chroma(collection_name=collection_name, embedding_function=embed, persist_directory=persist_directory)
+    stats = upsert_stream(splits, vectorstore, prune=True, **kwargs)
+    return vectorstore, stats
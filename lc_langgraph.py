@@ -1,14 +1,16 @@
-import sys, json
+import sys
+from functools import lru_cache, partial
 from typing import Annotated, Literal, TypedDict
 
 from langchain_core.messages import HumanMessage
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_openai import AzureChatOpenAI #ChatOpenAI
-from langgraph.checkpoint import MemorySaver
+from langchain_core.runnables import RunnableLambda
+from lc_tool_cache import cached_tool
+from lc_clients import chat_model
+from lc_checkpoint import CompactSqliteSaver
 from langgraph.graph import END, StateGraph, MessagesState
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
+from lc_tool_node import create_concurrent_tool_node
+from lc_stream import stream_graph, print_metrics
 
 class AgentState(TypedDict):
     # Messages have the type "list". The `add_messages` function
@@ -16,25 +18,25 @@ class AgentState(TypedDict):
     # (in this case, it appends messages to the list, rather than overwriting them)
     messages: Annotated[list, add_messages]
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
 
 # Define the tools for the agent to use
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-tools = [wikipedia]
-tool_node = ToolNode(tools)
-
-model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0.9)
-model.bind_tools(tools)
+# Repeated lookups are served from a TTL cache (memory + disk). Built on first use and shared,
+# so importing build_app (as lc_bench does) needs neither the wikipedia package nor ./cache.
+@lru_cache(maxsize=None)
+def default_tools() -> tuple:
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    return (cached_tool(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper()), ttl=24 * 3600, path="./cache/wikipedia.sqlite"),)
+
+# Tool calls of one turn run concurrently, each with its own timeout
+def default_tool_node():
+    tools = default_tools()
+    return create_concurrent_tool_node(tools, max_concurrency=4, timeouts={tool.name: 20.0 for tool in tools})
+
+# The model is built on first use, so importing this module does not read param.json.
+# The tools are bound so the model can request them and should_continue can route to "tools".
+def get_model():
+    return chat_model(temperature=0.9).bind_tools(list(default_tools()))
 
 # Define the function that determines whether to continue or not
 def should_continue(state: AgentState) -> Literal["tools", END]:
@@ -47,12 +49,53 @@ def should_continue(state: AgentState) -> Literal["tools", END]:
     return END
 
 # Define the function that calls the model
-def call_model(state: AgentState):
+def call_model(state: AgentState, get_model=get_model):
     messages = state['messages']
-    response = model.invoke(messages)
+    response = get_model().invoke(messages)
     # We return a list, because this will get added to the existing list
     return {"messages": [response]}
 
+# Async twin of call_model, used when the graph is streamed token by token
+async def acall_model(state: AgentState, get_model=get_model):
+    messages = state['messages']
+    response = await get_model().ainvoke(messages)
+    return {"messages": [response]}
+
+# `model_factory` and `tools_node` replace the Azure model and the Wikipedia tool node,
+# e.g. with the lc_fake stand-ins in lc_bench
+def build_app(checkpointer, model_factory=get_model, tools_node=None):
+    if tools_node is None:
+        tools_node = default_tool_node()
+    # Define a new graph
+    workflow = StateGraph(MessagesState)
+
+    # Define the two nodes we will cycle between
+    workflow.add_node("agent", RunnableLambda(partial(call_model, get_model=model_factory), afunc=partial(acall_model, get_model=model_factory)))
+    workflow.add_node("tools", tools_node)
+
+    # Set the entrypoint as `agent`
+    # This means that this node is the first one called
+    workflow.set_entry_point("agent")
+
+    # We now add a conditional edge
+    workflow.add_conditional_edges(
+        # First, we define the start node. We use `agent`.
+        # This means these are the edges taken after the `agent` node is called.
+        "agent",
+        # Next, we pass in the function that will determine which node is called next.
+        should_continue,
+    )
+
+    # We now add a normal edge from `tools` to `agent`.
+    # This means that after `tools` is called, `agent` node is called next.
+    workflow.add_edge("tools", 'agent')
+
+    # Finally, we compile it!
+    # This compiles it into a LangChain Runnable,
+    # meaning you can use it as you would any other runnable.
+    # Note that we're (optionally) passing the memory when compiling the graph
+    return workflow.compile(checkpointer=checkpointer)
+
 def main():
     try:
         print("Hello, Langgraph!")
@@ -60,38 +103,9 @@ def main():
         run_option = 0
         match run_option:
             case 0:
-                # Define a new graph
-                workflow = StateGraph(MessagesState)
-
-                # Define the two nodes we will cycle between
-                workflow.add_node("agent", call_model)
-                workflow.add_node("tools", tool_node)
-
-                # Set the entrypoint as `agent`
-                # This means that this node is the first one called
-                workflow.set_entry_point("agent")
-
-                # We now add a conditional edge
-                workflow.add_conditional_edges(
-                    # First, we define the start node. We use `agent`.
-                    # This means these are the edges taken after the `agent` node is called.
-                    "agent",
-                    # Next, we pass in the function that will determine which node is called next.
-                    should_continue,
-                )
-
-                # We now add a normal edge from `tools` to `agent`.
-                # This means that after `tools` is called, `agent` node is called next.
-                workflow.add_edge("tools", 'agent')
-
                 # Initialize memory to persist state between graph runs
-                checkpointer = MemorySaver()
-
-                # Finally, we compile it!
-                # This compiles it into a LangChain Runnable,
-                # meaning you can use it as you would any other runnable.
-                # Note that we're (optionally) passing the memory when compiling the graph
-                app = workflow.compile(checkpointer=checkpointer)
+                checkpointer = CompactSqliteSaver("./cache/checkpoints_langgraph.sqlite", keep_last=20)
+                app = build_app(checkpointer)
 
                 # Use the Runnable
                 final_state = app.invoke(
@@ -99,6 +113,16 @@ def main():
                     config={"configurable": {"thread_id": 42}}
                 )
                 print(final_state["messages"][-1].content)
+            case 1:
+                # Token streaming: print the answer as it is generated, then the latency figures
+                checkpointer = CompactSqliteSaver("./cache/checkpoints_langgraph.sqlite", keep_last=20)
+                app = build_app(checkpointer)
+                final_state, metrics = stream_graph(
+                    app,
+                    {"messages": [HumanMessage(content="who is the president of taiwan?")]},
+                    config={"configurable": {"thread_id": 43}},
+                )
+                print_metrics(metrics)
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
 
@@ -0,0 +1,110 @@
+# Structure-aware splitter for statutes: one chunk per article (第X條), grouped by chapter (第X章)
+import re
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from lc_hybrid import chinese_number
+
+NUMERAL = r"[0-9零〇一二兩三四五六七八九十百千]+"
+# Headings start a line and are followed by whitespace or the end of the line, which tells
+# "第 12 條 勞工有左列情形..." apart from in-text references such as "依第十二條規定".
+# Sub-articles are written either way: 第八十四條之一 or, as in the official PDF, 第 84-1 條.
+CHAPTER_RE = re.compile(rf"^\s*第\s*({NUMERAL})\s*章(?:\s+(.*?))?\s*$")
+ARTICLE_RE = re.compile(rf"^\s*第\s*({NUMERAL})(?:\s*-\s*({NUMERAL}))?\s*條(?:\s*之\s*({NUMERAL}))?(?=\s|$)")
+
+# Canonical article number: "12", or "84-1" for 第 84-1 條 / 第八十四條之一 (the form lc_hybrid indexes)
+def article_number(match) -> str:
+    number = str(chinese_number(match.group(1)))
+    sub = match.group(2) or match.group(3)
+    return f"{number}-{chinese_number(sub)}" if sub else number
+
+# Splits statute text on its own structure instead of at fixed sizes. Pages are read as one
+# continuous text per source, so articles that cross a page break stay whole, and each
+# chunk holds whole articles with {"chapter", "article", "articles", "page"} metadata.
+# Consecutive articles of the same chapter are packed into one chunk while it stays within
+# `target_chunk_size` ("articles" then lists them all, e.g. "84,84-1,84-2"), which keeps
+# the number of chunks (and embeddings) below a plain size-based split; an article longer
+# than `max_chunk_size` is cut without overlap, each piece repeating the article heading.
+# Text before the first article (title, preamble) is a chunk of its own. Only the current
+# chunk is buffered, so this streams like lc_pipeline.split_stream; pages must arrive in
+# order (ParallelPDFLoader(ordered=True)).
+class LegalTextSplitter:
+    def __init__(self, max_chunk_size: int = 1500, target_chunk_size: int = 1200):
+        self.max_chunk_size = max_chunk_size
+        self.target_chunk_size = min(target_chunk_size, max_chunk_size)
+        self._fallback = RecursiveCharacterTextSplitter(chunk_size=max_chunk_size, chunk_overlap=0)
+
+    def _pieces(self, article: dict) -> Iterator[Document]:
+        metadata = {key: value for key, value in article.items() if key not in ("lines", "heading") and value is not None}
+        text = "\n".join(article["lines"]).strip()
+        if not text:
+            return
+        if len(text) <= self.max_chunk_size:
+            yield Document(page_content=text, metadata=metadata)
+            return
+        for index, piece in enumerate(self._fallback.split_text(text)):
+            if index and article["heading"]:
+                piece = f"{article['heading']}\n{piece}"
+            yield Document(page_content=piece, metadata=metadata)
+
+    def _mergeable(self, pending: dict, article: dict) -> bool:
+        if pending["source"] != article["source"] or pending["chapter"] != article["chapter"]:
+            return False
+        if pending["article"] is None or article["article"] is None:
+            return False
+        pending_size = sum(len(line) + 1 for line in pending["lines"])
+        size = sum(len(line) + 1 for line in article["lines"])
+        return pending_size + size <= self.target_chunk_size
+
+    def split_stream(self, pages: Iterable[Document]) -> Iterator[Document]:
+        pending = current = None
+        chapter = source = None
+
+        def finish(article: Optional[dict]) -> Iterator[Document]:
+            # Hand a completed article to the merge buffer, emitting what can no longer grow
+            nonlocal pending
+            if article is None:
+                return
+            if pending is not None and self._mergeable(pending, article):
+                pending["lines"].extend(article["lines"])
+                pending["articles"] += f",{article['article']}"
+                return
+            if pending is not None:
+                yield from self._pieces(pending)
+            pending = article
+
+        def start(page: Document, heading: Optional[str] = None, number: Optional[str] = None) -> dict:
+            return {"source": page.metadata.get("source"), "page": page.metadata.get("page"), "chapter": chapter,
+                    "article": number, "articles": number, "heading": heading, "lines": []}
+
+        for page in pages:
+            if page.metadata.get("source") != source:
+                # A new file: nothing carries over from the previous one
+                yield from finish(current)
+                if pending is not None:
+                    yield from self._pieces(pending)
+                pending = current = None
+                chapter, source = None, page.metadata.get("source")
+            for line in page.page_content.splitlines():
+                chapter_match = CHAPTER_RE.match(line)
+                if chapter_match:
+                    yield from finish(current)
+                    current = None
+                    title = chapter_match.group(2)
+                    chapter = f"第{chinese_number(chapter_match.group(1))}章" + (f" {title}" if title else "")
+                    continue
+                article_match = ARTICLE_RE.match(line)
+                if article_match:
+                    yield from finish(current)
+                    current = start(page, article_match.group(0).strip(), article_number(article_match))
+                elif current is None:
+                    if not line.strip():
+                        continue
+                    current = start(page)
+                current["lines"].append(line)
+        yield from finish(current)
+        if pending is not None:
+            yield from self._pieces(pending)
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        return list(self.split_stream(documents))
@@ -0,0 +1,80 @@
+# Exact-match LLM response cache for deterministic (temperature 0) calls
+import os, time, hashlib, sqlite3, threading
+from typing import Any, Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+DEFAULT_CACHE_PATH = "./cache/llm_responses.sqlite"
+
+# Persistent response cache shared by every process that opens the same file.
+# LangChain calls it with the rendered messages as `prompt` and an `llm_string`
+# that already carries the deployment, call params and any bound tool schemas
+# (bind_tools / with_structured_output), so the pair is the full cache key.
+# Beyond `max_entries` the least recently used responses are evicted.
+class SQLiteLRUCache(BaseCache):
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, generations TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT generations FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, generations, last_access) VALUES (?, ?, ?)",
+                (key, dumps(return_val), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+_caches = {}
+
+# Cache to pass as `cache=` to a chat model: the shared response cache at temperature 0,
+# and None otherwise, since sampled outputs are not meant to be replayed
+def llm_cache_for(temperature: float, path: str = DEFAULT_CACHE_PATH) -> Optional[BaseCache]:
+    if temperature != 0:
+        return None
+    if path not in _caches:
+        _caches[path] = SQLiteLRUCache(path)
+    return _caches[path]
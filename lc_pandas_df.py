@@ -1,27 +1,19 @@
 import sys, json
 import pandas as pd
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from lc_clients import chat_model, embeddings
+from lc_llm_cache import llm_cache_for
+from lc_trace import StageTracer
 from langchain.agents.agent_types import AgentType
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
 
 def main():
     try:
         print("Hello, LangChain Pandas Dataframe!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0)
-        embed = AzureOpenAIEmbeddings(deployment=azure_embd_deployment, openai_api_key=azure_apikey, openai_api_version=azure_apiversion, openai_api_type=azure_apitype, azure_endpoint=azure_apibase)
+        llm_cache = llm_cache_for(0)
+        model = chat_model(temperature=0, cache=llm_cache)
+        embed = embeddings()
          
         run_option = 0        
         match run_option:
@@ -40,7 +32,9 @@ def main():
                     allow_dangerous_code=True,
                 )
                 
-                print(agent.invoke("how many rows are there?"))
+                tracer = StageTracer().watch("llm_cache", llm_cache)
+                print(agent.invoke("how many rows are there?", config={"callbacks": [tracer]}))
+                print(json.dumps(tracer.summary(), indent=2))
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
 
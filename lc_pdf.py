@@ -1,66 +1,75 @@
-import sys, json
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_chroma import Chroma
+import sys
+from lc_pdf_loader import ParallelPDFLoader
+from lc_clients import chat_model, embeddings
+from lc_llm_cache import llm_cache_for
+from lc_embed_cache import CachedEmbeddings
+from lc_embed_batch import ConcurrentEmbeddings
+from lc_index import sync_chroma
+from lc_pipeline import split_stream
+from lc_hybrid import BM25Index, HybridRetriever
+from lc_legal_splitter import LegalTextSplitter
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
+system_prompt = (
+    "You are an assistant for question-answering tasks. "
+    "Use the following pieces of retrieved context to answer "
+    "the question. If you don't know the answer, say that you "
+    "don't know. Use three sentences maximum and keep the "
+    "answer concise."
+    "\n\n"
+    "{context}"
+)
+
+# Index the PDF and build its QA chain; shared by main() and lc_server
+# With `structured` the statute is split per article (第X條) instead of into fixed-size overlapping chunks
+def build_rag_chain(model, embed, file_path: str = "./data/LaborStandardsAct.pdf", structured: bool = True, verbose: bool = False):
+    # Pages are extracted on a process pool and streamed into the splitter (in page order, so articles crossing a page stay whole)
+    loader = ParallelPDFLoader([file_path], ordered=structured)
+    #docs = loader.load()
+    #print(len(docs))
+    #print(docs[0].page_content[0:100])
+    #print(docs[0].metadata)
+
+    if structured:
+        splits = LegalTextSplitter(max_chunk_size=1500, target_chunk_size=1200).split_stream(loader.lazy_load())
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        splits = split_stream(loader.lazy_load(), text_splitter)
+    # Splits are also indexed for BM25 on their way to the vector store
+    lexical = BM25Index()
+    splits = lexical.index_stream(splits)
+    # Persistent collection keyed by content hash: unchanged splits are never re-embedded
+    vectorstore, stats = sync_chroma(splits, embed, persist_directory="./chroma_db", collection_name="labor_standards_act")
+    if verbose:
+        print(f"Index sync: {stats}")
+        print(f"Embedding cache: {embed.stats()}")
+    # Exact article numbers and legal terms are answered from BM25 without embedding the question
+    retriever = HybridRetriever(vectorstore=vectorstore, index=lexical)
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", "{input}"),
+        ]
+    )
+
+    question_answer_chain = create_stuff_documents_chain(model, prompt)
+    return create_retrieval_chain(retriever, question_answer_chain)
 
 def main():
     try:
         print("Hello, LangChain PDF!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0)
-        embed = AzureOpenAIEmbeddings(deployment=azure_embd_deployment, openai_api_key=azure_apikey, openai_api_version=azure_apiversion, openai_api_type=azure_apitype, azure_endpoint=azure_apibase)
+        model = chat_model(temperature=0, cache=llm_cache_for(0))
+        embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
          
         run_option = 0        
         match run_option:
             case 0:
-                file_path = "./data/LaborStandardsAct.pdf"
-                loader = PyPDFLoader(file_path)
-                docs = loader.load()
-                #print(len(docs))
-                #print(docs[0].page_content[0:100])
-                #print(docs[0].metadata)
-
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-                splits = text_splitter.split_documents(docs)
-                vectorstore = Chroma.from_documents(documents=splits, embedding=embed)
-                retriever = vectorstore.as_retriever()
-
-                system_prompt = (
-                    "You are an assistant for question-answering tasks. "
-                    "Use the following pieces of retrieved context to answer "
-                    "the question. If you don't know the answer, say that you "
-                    "don't know. Use three sentences maximum and keep the "
-                    "answer concise."
-                    "\n\n"
-                    "{context}"
-                )
-
-                prompt = ChatPromptTemplate.from_messages(
-                    [
-                        ("system", system_prompt),
-                        ("human", "{input}"),
-                    ]
-                )
-
-
-                question_answer_chain = create_stuff_documents_chain(model, prompt)
-                rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+                rag_chain = build_rag_chain(model, embed, verbose=True)
 
                 results = rag_chain.invoke({"input": "勞工犯了那些錯，雇主就可以終止契約?"})
                 print(results['answer'])
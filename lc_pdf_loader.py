@@ -0,0 +1,76 @@
+# Parallel PDF page extraction across a process pool
+import os, multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain, islice
+from typing import Iterator, List, Optional, Union
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+# Runs in a worker process: extract the text of pages [start, end) of one PDF
+def _extract_pages(file_path: str, start: int, end: int) -> List[tuple]:
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    return [(page_number, reader.pages[page_number].extract_text()) for page_number in range(start, end)]
+
+def _page_count(file_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+# Drop-in for PyPDFLoader over many files: pages are extracted in `pages_per_task`
+# slices on a process pool and yielded as soon as each slice finishes, with the
+# same {"source", "page"} metadata PyPDFLoader produces. Set `ordered=True` to
+# yield pages in file/page order instead (still streaming, buffering out-of-order slices).
+# Files are sliced as they are reached and at most `max_workers * 2` slices are in flight
+# or buffered, so memory does not grow with the number of files or pages. Workers are
+# spawned, not forked: forking a process that runs other threads (lc_server warms its
+# chains in threads) can copy a held lock into the child and deadlock it.
+class ParallelPDFLoader(BaseLoader):
+    def __init__(self, file_paths: Union[str, List[str]], max_workers: Optional[int] = None, pages_per_task: int = 8, ordered: bool = False):
+        self.file_paths = [file_paths] if isinstance(file_paths, str) else list(file_paths)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.ordered = ordered
+
+    def _tasks(self) -> Iterator[tuple]:
+        for file_path in self.file_paths:
+            count = _page_count(file_path)
+            for start in range(0, count, self.pages_per_task):
+                yield (file_path, start, min(start + self.pages_per_task, count))
+
+    @staticmethod
+    def _to_documents(file_path: str, pages: List[tuple]) -> Iterator[Document]:
+        for page_number, text in pages:
+            yield Document(page_content=text, metadata={"source": file_path, "page": page_number})
+
+    def lazy_load(self) -> Iterator[Document]:
+        tasks = self._tasks()
+        head = list(islice(tasks, 2))
+        if self.max_workers <= 1 or len(head) <= 1:
+            for file_path, start, end in chain(head, tasks):
+                yield from self._to_documents(file_path, _extract_pages(file_path, start, end))
+            return
+
+        tasks = chain(head, tasks)
+        window = self.max_workers * 2
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            def submit(count: int) -> list:
+                return [(task[0], pool.submit(_extract_pages, *task)) for task in islice(tasks, count)]
+
+            if not self.ordered:
+                pending = dict((future, file_path) for file_path, future in submit(window))
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    finished = [(pending.pop(future), future) for future in done]
+                    pending.update((future, file_path) for file_path, future in submit(len(finished)))
+                    for file_path, future in finished:
+                        yield from self._to_documents(file_path, future.result())
+                return
+
+            # Slices are submitted in order, so the oldest one is always the next to yield
+            queued = deque(submit(window))
+            while queued:
+                file_path, future = queued.popleft()
+                pages = future.result()
+                queued.extend(submit(1))
+                yield from self._to_documents(file_path, pages)
@@ -0,0 +1,74 @@
+# Streaming load -> split -> embed -> upsert pipeline with bounded memory
+import hashlib, json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+
+# Content hash of a split: the same text with the same metadata always maps to the same id
+def split_id(doc) -> str:
+    payload = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Split documents one at a time, so only the current document's chunks are held in memory
+def split_stream(docs: Iterable[Document], text_splitter) -> Iterator[Document]:
+    for doc in docs:
+        yield from text_splitter.split_documents([doc])
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Embed and upsert splits batch by batch. At most `max_in_flight` batches are being
+# embedded at once; the upstream generators are not advanced until a slot frees up,
+# so memory stays flat and the first batches are searchable before the corpus is read.
+# Splits are keyed by split_id(): batches already present in a Chroma collection are
+# skipped, and with `prune=True` ids not seen in this run are deleted at the end.
+def upsert_stream(splits: Iterable[Document], vectorstore, batch_size: int = 64, max_in_flight: int = 2,
+                  prune: bool = False, on_batch: Optional[Callable[[dict], None]] = None) -> dict:
+    stats = {"added": 0, "deleted": 0, "kept": 0}
+    seen = set()
+    can_lookup = hasattr(vectorstore, "get")
+
+    def unique(splits):
+        for doc in splits:
+            doc_id = split_id(doc)
+            if doc_id not in seen:
+                seen.add(doc_id)
+                yield doc_id, doc
+
+    def upsert(batch: List[tuple]) -> dict:
+        ids = [doc_id for doc_id, _ in batch]
+        existing = set(vectorstore.get(ids=ids, include=[])["ids"]) if can_lookup else set()
+        new = [(doc_id, doc) for doc_id, doc in batch if doc_id not in existing]
+        if new:
+            vectorstore.add_documents([doc for _, doc in new], ids=[doc_id for doc_id, _ in new])
+        return {"added": len(new), "kept": len(batch) - len(new)}
+
+    def collect(result: dict):
+        stats["added"] += result["added"]
+        stats["kept"] += result["kept"]
+        if on_batch:
+            on_batch(dict(stats))
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for batch in batched(unique(splits), batch_size):
+            if len(pending) >= max_in_flight:
+                collect(pending.popleft().result())
+            pending.append(pool.submit(upsert, batch))
+        while pending:
+            collect(pending.popleft().result())
+
+    if prune and can_lookup:
+        stale_ids = [doc_id for doc_id in vectorstore.get(include=[])["ids"] if doc_id not in seen]
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+        stats["deleted"] = len(stale_ids)
+    return stats
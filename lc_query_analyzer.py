@@ -1,5 +1,5 @@
 # Build a Query Analysis System
-import sys, json, datetime
+import sys, datetime
 from typing import Optional, List
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -8,20 +8,14 @@ from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.documents import Document
 from langchain_community.document_loaders import YoutubeLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from lc_clients import chat_model, embeddings
+from lc_llm_cache import llm_cache_for
+from lc_embed_cache import CachedEmbeddings
+from lc_embed_batch import ConcurrentEmbeddings
 from langchain_chroma import Chroma
+from lc_pipeline import split_stream, upsert_stream
+from lc_concurrent_loader import ConcurrentLoader
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
 
 # Query schema: Explicit min and max attributes for publication date so that it can be filtered on
 class Search(BaseModel):
@@ -37,8 +31,8 @@ def main():
     try:
         print("Hello, LangChain Query Analyzer!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0)
-        embed = AzureOpenAIEmbeddings(deployment=azure_embd_deployment, openai_api_key=azure_apikey, openai_api_version=azure_apiversion, openai_api_type=azure_apitype, azure_endpoint=azure_apibase)
+        model = chat_model(temperature=0, cache=llm_cache_for(0))
+        embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
 
         # Use the YouTubeLoader to load transcripts of a few LangChain videos
         urls = [
@@ -56,26 +50,29 @@ def main():
             "https://www.youtube.com/watch?v=DjuXACWYkkU",
             "https://www.youtube.com/watch?v=o7C9ld6Ln-M",
         ]
-        docs = []
-        for url in urls:
-            transcript = YoutubeLoader.from_youtube_url(url, add_video_info=True).load()
-            #print(transcript)
-            docs.extend(transcript)
-
-        # Add some additional metadata: what year the video was published
-        for doc in docs:
-            doc.metadata["publish_year"] = int(datetime.datetime.strptime(doc.metadata["publish_date"], "%Y-%m-%d %H:%M:%S").strftime("%Y"))
-
-        #print([doc.metadata["title"] for doc in docs])
-        #for doc in docs:
-        #    print(doc.metadata)
-
+        # Fetch transcripts concurrently; re-runs are served from the on-disk cache
+        loader = ConcurrentLoader(
+            lambda url: YoutubeLoader.from_youtube_url(url, add_video_info=True).load(),
+            max_concurrency=6,
+            timeout=60.0,
+            cache_dir="./cache/transcripts",
+        )
+        failures = {}
+        transcripts = loader.stream(urls, failures)
+
+        def load_docs():
+            for doc in transcripts:
+                # Add some additional metadata: what year the video was published
+                doc.metadata["publish_year"] = int(datetime.datetime.strptime(doc.metadata["publish_date"], "%Y-%m-%d %H:%M:%S").strftime("%Y"))
+                #print(doc.metadata)
+                yield doc
+
+        # Transcripts are split and indexed as they arrive instead of being materialized first
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000)
-        chunked_docs = text_splitter.split_documents(docs)
-        vectorstore = Chroma.from_documents(
-            chunked_docs,
-            embed,
-        )     
+        vectorstore = Chroma(embedding_function=embed)
+        upsert_stream(split_stream(load_docs(), text_splitter), vectorstore)
+        for url, error in failures.items():
+            print(f"Warning: skipped {url} ({error})")
 
          
         run_option = 1      
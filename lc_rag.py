@@ -1,71 +1,99 @@
 # Build a Retrieval Augmented Generation (RAG) App
-import sys, json
+import sys
+from operator import itemgetter
 import bs4
 from langchain import hub
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_chroma import Chroma
+from lc_clients import chat_model, embeddings
+from lc_embed_cache import CachedEmbeddings
+from lc_embed_batch import ConcurrentEmbeddings
+from lc_vector_store import NumpyVectorStore
+from lc_pipeline import split_stream, upsert_stream
+from lc_answer_cache import SemanticCache
+from lc_trace import StageTracer
 from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.chat_message_histories import ChatMessageHistory
+from lc_session_store import SessionStore
+from lc_history import HistoryCompactor, ContextRouter, SpeculativeRetriever, create_routed_history_aware_retriever
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.chains import create_retrieval_chain, create_history_aware_retriever
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
-store = {}
+# Chat sessions: bounded in memory, durable in SQLite
+store = SessionStore(max_sessions=1000, ttl=3600, max_messages=50, path="./cache/sessions.sqlite")
 
 def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return store.get_session_history(session_id)
+
+# Load, index and return a retriever over the blog; shared by main() and lc_server
+def build_retriever(embed):
+    # Load, chunk and index the contents of the blog.
+    loader = WebBaseLoader(
+        web_paths=("https://lilianweng.github.io/posts/2023-06-23-agent/",),
+        bs_kwargs=dict(
+            parse_only=bs4.SoupStrainer(
+                class_=("post-content", "post-title", "post-header")
+            )
+        ),
+    )
+    #print(docs)
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    # lazy_load fetches the page(s) one at a time; the splits are embedded and indexed in batches
+    # as they are produced, so the list of splits is never materialized
+    splits = split_stream(loader.lazy_load(), text_splitter)
+    #for chun in splits:
+    #    print(f'page_content\n{chun.page_content}')
+    #    print(f'metadata\n{chun.metadata}')
+            
+    # Retrieve and generate using the relevant snippets of the blog.
+    # One blog post fits in memory: a float16 NumPy matrix instead of a Chroma collection
+    vectorstore = NumpyVectorStore(embed, dtype="float16")
+    upsert_stream(splits, vectorstore)
+    return vectorstore.as_retriever()
+
+# Built-in retrieval chain behind a semantic answer cache; shared by main() and lc_server
+def build_qa_chain(model, retriever, embed):
+    system_prompt = (
+        "You are an assistant for question-answering tasks. "
+        "Use the following pieces of retrieved context to answer "
+        "the question. If you don't know the answer, say that you "
+        "don't know. Use three sentences maximum and keep the "
+        "answer concise."
+        "\n\n"
+        "{context}"
+    )
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", "{input}"),
+        ]
+    )
+
+    question_answer_chain = create_stuff_documents_chain(model, prompt)
+    # The answering half of create_retrieval_chain: the cache retrieves and hands over "context",
+    # and near-identical questions over unchanged context are answered from the cache
+    rag_chain = RunnablePassthrough.assign(answer=question_answer_chain)
+    return SemanticCache(rag_chain, retriever, embed, input_key="input")
 
 def main():
     try:
         print("Hello, LangChain RAG!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0.9)
-        embed = AzureOpenAIEmbeddings(deployment=azure_embd_deployment, openai_api_key=azure_apikey, openai_api_version=azure_apiversion, openai_api_type=azure_apitype, azure_endpoint=azure_apibase)
+        model = chat_model(temperature=0.9)
+        embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
 
-        # Load, chunk and index the contents of the blog.
-        loader = WebBaseLoader(
-            web_paths=("https://lilianweng.github.io/posts/2023-06-23-agent/",),
-            bs_kwargs=dict(
-                parse_only=bs4.SoupStrainer(
-                    class_=("post-content", "post-title", "post-header")
-                )
-            ),
-        )
-        docs = loader.load()
-        #print(docs)
-
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-        #print(f'splits count = {len(splits)}')
-        #for chun in splits:
-        #    print(f'page_content\n{chun.page_content}')
-        #    print(f'metadata\n{chun.metadata}')
-                
-        # Retrieve and generate using the relevant snippets of the blog.
-        vectorstore = Chroma.from_documents(documents=splits, embedding=embed)                
-        retriever = vectorstore.as_retriever()
+        retriever = build_retriever(embed)
+
+        compactor = HistoryCompactor(model, max_tokens=1500, max_turns=6)
+        router = ContextRouter()
 
         run_option = 4  
         match run_option:
@@ -89,27 +117,16 @@ def main():
             
             case 1:
                 # Built-in chains
-                system_prompt = (
-                    "You are an assistant for question-answering tasks. "
-                    "Use the following pieces of retrieved context to answer "
-                    "the question. If you don't know the answer, say that you "
-                    "don't know. Use three sentences maximum and keep the "
-                    "answer concise."
-                    "\n\n"
-                    "{context}"
-                )
-                prompt = ChatPromptTemplate.from_messages(
-                    [
-                        ("system", system_prompt),
-                        ("human", "{input}"),
-                    ]
-                )
+                rag_chain = build_qa_chain(model, retriever, embed)
 
-                question_answer_chain = create_stuff_documents_chain(model, prompt)
-                rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-
-                response = rag_chain.invoke({"input": "What is Task Decomposition?"})
+                # Per-stage latency and tokens, plus the caches' hit counts, to find the hot stage
+                tracer = StageTracer(path="./cache/trace.jsonl").watch("embeddings", embed).watch("embedding_batches", embed.embeddings).watch("answers", rag_chain)
+                response = rag_chain.invoke({"input": "What is Task Decomposition?"}, config={"callbacks": [tracer]})
+                print(response["answer"])
+                response = rag_chain.invoke({"input": "What is task decomposition?"}, config={"callbacks": [tracer]})
                 print(response["answer"])
+                print(rag_chain.stats())
+                print(tracer.prometheus_text())
             
             case 2:
                 # Customizing the prompt
@@ -126,13 +143,16 @@ def main():
 
                 custom_rag_prompt = PromptTemplate.from_template(template)
 
+                # The cache retrieves and passes the documents on under "context"
                 rag_chain = (
-                    {"context": retriever | format_docs, "question": RunnablePassthrough()}
+                    {"context": itemgetter("context") | RunnableLambda(format_docs), "question": itemgetter("question")}
                     | custom_rag_prompt
                     | model
                     | StrOutputParser()
                 )
 
+                rag_chain = SemanticCache(rag_chain, retriever, embed, input_key="question")
+
                 response = rag_chain.invoke("What is Task Decomposition?")
                 print(response)
 
@@ -153,8 +173,9 @@ def main():
                         ("human", "{input}"),
                     ]
                 )
-                history_aware_retriever = create_history_aware_retriever(
-                    model, retriever, contextualize_q_prompt
+                # Only questions that depend on the history pay for the rephrase call
+                history_aware_retriever = create_routed_history_aware_retriever(
+                    model, retriever, contextualize_q_prompt, router
                 )
 
                 system_prompt = (
@@ -174,7 +195,8 @@ def main():
                     ]
                 )
                 question_answer_chain = create_stuff_documents_chain(model, qa_prompt)
-                rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+                # Older turns are folded into a cached summary so prompts stay within budget
+                rag_chain = compactor.as_runnable() | create_retrieval_chain(history_aware_retriever, question_answer_chain)
 
                 # Test
                 chat_history = []
@@ -191,6 +213,7 @@ def main():
                 ai_msg_2 = rag_chain.invoke({"input": second_question, "chat_history": chat_history})
 
                 print(ai_msg_2["answer"])
+                print(router.stats())
 
             case 4:
                 contextualize_q_system_prompt = (
@@ -208,9 +231,16 @@ def main():
                         ("human", "{input}"),
                     ]
                 )
-                history_aware_retriever = create_history_aware_retriever(
-                    model, retriever, contextualize_q_prompt
-                )
+                # Only questions that depend on the history pay for the rephrase call.
+                # In speculative mode retrieval with the raw question overlaps the rephrase call.
+                speculative = True
+                if speculative:
+                    speculative_retriever = SpeculativeRetriever(model, retriever, contextualize_q_prompt, router)
+                    history_aware_retriever = speculative_retriever.as_runnable()
+                else:
+                    history_aware_retriever = create_routed_history_aware_retriever(
+                        model, retriever, contextualize_q_prompt, router
+                    )
 
                 system_prompt = (
                     "You are an assistant for question-answering tasks. "
@@ -229,7 +259,8 @@ def main():
                     ]
                 )
                 question_answer_chain = create_stuff_documents_chain(model, qa_prompt)
-                rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+                # Older turns are folded into a cached summary so prompts stay within budget
+                rag_chain = compactor.as_runnable() | create_retrieval_chain(history_aware_retriever, question_answer_chain)
 
                 # Stateful management of chat history
                 conversational_rag_chain = RunnableWithMessageHistory(
@@ -261,6 +292,9 @@ def main():
                         prefix = "User"
 
                     print(f"{prefix}: {message.content}\n")
+                print(router.stats())
+                if speculative:
+                    print(speculative_retriever.stats())
 
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
@@ -1,32 +1,25 @@
-import sys, json
+import sys
 import bs4
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from lc_clients import chat_model, embeddings
+from lc_embed_cache import CachedEmbeddings
+from lc_embed_batch import ConcurrentEmbeddings
 from langchain.tools.retriever import create_retriever_tool
 from langgraph.prebuilt import create_react_agent
 from langchain_chroma import Chroma
+from lc_pipeline import split_stream, upsert_stream
 from langchain_core.messages import HumanMessage
+from lc_stream import stream_graph_turns, print_metrics
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langgraph.checkpoint.sqlite import SqliteSaver
-
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
+from lc_checkpoint import CompactSqliteSaver
+
 
 def main():
     try:
         print("Hello, LangChain RAG Agent!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0.9)
-        embed = AzureOpenAIEmbeddings(deployment=azure_embd_deployment, openai_api_key=azure_apikey, openai_api_version=azure_apiversion, openai_api_type=azure_apitype, azure_endpoint=azure_apibase)
+        model = chat_model(temperature=0.9)
+        embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
         
         # Load, chunk and index the contents of the blog.
         loader = WebBaseLoader(
@@ -37,13 +30,15 @@ def main():
                 )
             ),
         )
-        docs = loader.load()
 
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
+        # lazy_load fetches the page(s) one at a time; the splits are embedded and indexed in batches
+        # as they are produced, so the list of splits is never materialized
+        splits = split_stream(loader.lazy_load(), text_splitter)
                 
         # Retrieve and generate using the relevant snippets of the blog.
-        vectorstore = Chroma.from_documents(documents=splits, embedding=embed)                
+        vectorstore = Chroma(embedding_function=embed)
+        upsert_stream(splits, vectorstore)
         retriever = vectorstore.as_retriever()
 
         # Retrieval tool
@@ -71,7 +66,8 @@ def main():
 
             case 1:
                 # Agent constructor with memory
-                memory = SqliteSaver.from_conn_string(":memory:")
+                # Durable checkpoints that survive restarts; only the newest 20 per thread are kept
+                memory = CompactSqliteSaver("./cache/checkpoints_rag_agent.sqlite", keep_last=20)
 
                 agent_executor = create_react_agent(model, tools, checkpointer=memory)
 
@@ -98,6 +94,16 @@ def main():
                     print(s)
                     print("----")
 
+            case 2:
+                # Token streaming with time-to-first-token and per-node latency
+                memory = CompactSqliteSaver("./cache/checkpoints_rag_agent.sqlite", keep_last=20)
+                agent_executor = create_react_agent(model, tools, checkpointer=memory)
+                config = {"configurable": {"thread_id": "abc124"}}
+                queries = ["What is Task Decomposition?", "What according to the blog post are common ways of doing it? redo the search"]
+                # All turns run in one event loop
+                turns = [{"messages": [HumanMessage(content=query)]} for query in queries]
+                stream_graph_turns(agent_executor, turns, config, on_turn=lambda _, metrics: (print_metrics(metrics), print("----")))
+
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
 
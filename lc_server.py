@@ -0,0 +1,251 @@
+# Long-running server that builds the RAG, PDF, SQL and LangGraph chains once and serves them over HTTP
+import os, sys, json, time, uuid, argparse, threading, socketserver
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Optional
+
+# A chain built once and served many times. `build` runs on first use or during warm-up and
+# returns (handler, probe): handler(payload, config) answers one request and probe() warms
+# the parts that do not cost model tokens (embedding client, vector store, schema).
+class Service:
+    def __init__(self, name: str, build: Callable[[], tuple]):
+        self.name = name
+        self.build = build
+        self.state = "cold"
+        self.error = None
+        self.handler = None
+        self.requests = 0
+        self.build_seconds = None
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        with self._lock:
+            if self.handler is None:
+                self.state = "building"
+                start = time.perf_counter()
+                try:
+                    handler, probe = self.build()
+                    if probe is not None:
+                        probe()
+                except Exception as e:
+                    self.state = "error"
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.handler = handler
+                self.build_seconds = round(time.perf_counter() - start, 3)
+                self.state = "ready"
+                self.error = None
+        return self.handler
+
+    def status(self) -> dict:
+        status = {"state": self.state, "requests": self.requests, "build_seconds": self.build_seconds}
+        if self.error:
+            status["error"] = self.error
+        return status
+
+# Heavy imports happen inside the builders, so the server starts listening at once and
+# /health can report progress while the indexes are built.
+def build_rag():
+    from lc_clients import chat_model, embeddings
+    from lc_embed_cache import CachedEmbeddings
+    from lc_embed_batch import ConcurrentEmbeddings
+    from lc_rag import build_retriever, build_qa_chain
+
+    embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
+    retriever = build_retriever(embed)
+    chain = build_qa_chain(chat_model(temperature=0.9), retriever, embed)
+
+    def handle(payload: dict, config: dict) -> dict:
+        return {"answer": chain.invoke({"input": payload["input"]}, config=config)["answer"]}
+    return handle, lambda: retriever.invoke("warm up")
+
+def build_pdf():
+    from lc_clients import chat_model, embeddings
+    from lc_llm_cache import llm_cache_for
+    from lc_embed_cache import CachedEmbeddings
+    from lc_embed_batch import ConcurrentEmbeddings
+    from lc_pdf import build_rag_chain
+
+    embed = CachedEmbeddings(ConcurrentEmbeddings(embeddings(max_retries=0)))
+    chain = build_rag_chain(chat_model(temperature=0, cache=llm_cache_for(0)), embed)
+
+    def handle(payload: dict, config: dict) -> dict:
+        return {"answer": chain.invoke({"input": payload["input"]}, config=config)["answer"]}
+    return handle, lambda: embed.embed_query("warm up")
+
+def build_sql():
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+    from lc_clients import chat_model, embeddings
+    from lc_embed_cache import CachedEmbeddings
+    from lc_sql_pool import ReadOnlySQLitePool
+    from lc_sql_schema import CachedSQLDatabase, TableSelector
+    from lc_sqlite import build_answer_chain
+
+    db = CachedSQLDatabase.from_uri("sqlite:///data/Chinook.db")
+    selector = TableSelector(db, CachedEmbeddings(embeddings()))
+    select_tables = RunnablePassthrough.assign(table_names_to_use=RunnableLambda(lambda x: selector.select(x["question"])))
+    pool = ReadOnlySQLitePool("data/Chinook.db", size=4, timeout=10.0)
+    chain = build_answer_chain(chat_model(temperature=0.9), db, select_tables, pool)
+
+    def handle(payload: dict, config: dict) -> dict:
+        db.refresh_if_changed()
+        return {"answer": chain.invoke({"question": payload["input"]}, config=config)}
+    return handle, lambda: selector.select("warm up")
+
+def build_agent():
+    from langchain_core.messages import HumanMessage
+    from lc_checkpoint import CompactSqliteSaver
+    from lc_langgraph import build_app, get_model
+
+    app = build_app(CompactSqliteSaver("./cache/checkpoints_server.sqlite", keep_last=20))
+
+    def handle(payload: dict, config: dict) -> dict:
+        # Without a thread_id every request is a new conversation
+        thread_id = payload.get("thread_id") or uuid.uuid4().hex
+        config = {**config, "configurable": {"thread_id": thread_id}}
+        final_state = app.invoke({"messages": [HumanMessage(content=payload["input"])]}, config=config)
+        return {"answer": final_state["messages"][-1].content, "thread_id": thread_id}
+    return handle, get_model
+
+BUILDERS = {"rag": build_rag, "pdf": build_pdf, "sql": build_sql, "agent": build_agent}
+
+class ChainServer:
+    def __init__(self, services: list, max_concurrency: int = 16, tracer=None):
+        self.services = {name: Service(name, BUILDERS[name]) for name in services}
+        self.tracer = tracer
+        self.warming = False
+        # Bounds requests in flight; the rest wait in their handler threads
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    # Builds every service concurrently; they share nothing but the pooled clients
+    def warm_up(self):
+        self.warming = True
+        with ThreadPoolExecutor(max_workers=len(self.services) or 1) as pool:
+            for service in self.services.values():
+                pool.submit(self._ensure_quietly, service)
+        self.warming = False
+
+    def _ensure_quietly(self, service: Service):
+        try:
+            service.ensure()
+        except Exception:
+            print(f"{service.name}: warm-up failed ({service.error})", file=sys.stderr)
+
+    def health(self) -> tuple:
+        services = {name: service.status() for name, service in self.services.items()}
+        ready = all(service.state == "ready" for service in self.services.values())
+        status = "ok" if ready else ("warming" if self.warming else "degraded")
+        return (200 if ready else 503), {"status": status, "services": services}
+
+    def handle(self, name: str, payload: dict) -> tuple:
+        service = self.services.get(name)
+        if service is None:
+            return 404, {"error": f"unknown service {name}"}
+        if not isinstance(payload.get("input"), str) or not payload["input"].strip():
+            return 400, {"error": "'input' must be a non-empty string"}
+        try:
+            handler = service.ensure()
+        except Exception:
+            return 503, {"error": f"{name} is unavailable: {service.error}"}
+        config = {"callbacks": [self.tracer]} if self.tracer is not None else {}
+        start = time.perf_counter()
+        with self._slots:
+            try:
+                result = handler(payload, config)
+            except Exception as e:
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+        with service._lock:
+            service.requests += 1
+        return 200, {**result, "seconds": round(time.perf_counter() - start, 3)}
+
+def _handler(server: ChainServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body, content_type: str = "application/json"):
+            data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(*server.health())
+            elif self.path == "/metrics" and server.tracer is not None:
+                self._send(200, server.tracer.prometheus_text(), "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                self._send(400, {"error": "body must be JSON"})
+                return
+            if not isinstance(payload, dict):
+                self._send(400, {"error": "body must be a JSON object"})
+                return
+            self._send(*server.handle(self.path.strip("/"), payload))
+
+    return Handler
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    # BaseHTTPRequestHandler expects (host, port) client addresses
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+def serve(services: list, host: str = "127.0.0.1", port: int = 8000, unix_socket: Optional[str] = None,
+          max_concurrency: int = 16, warm: bool = True):
+    from lc_trace import StageTracer
+
+    server = ChainServer(services, max_concurrency=max_concurrency, tracer=StageTracer())
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        httpd = ThreadingUnixHTTPServer(unix_socket, _handler(server))
+        address = unix_socket
+    else:
+        httpd = ThreadingHTTPServer((host, port), _handler(server))
+        address = "http://%s:%d" % httpd.server_address[:2]
+    if warm:
+        # Listen first, so /health answers "warming" while the chains are built
+        server.warming = True
+        threading.Thread(target=server.warm_up, daemon=True).start()
+    print(f"Serving {', '.join(services)} on {address}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+def main():
+    try:
+        parser = argparse.ArgumentParser(description="Serve the lc_* chains from warm, long-lived instances.")
+        parser.add_argument("services", nargs="*", default=list(BUILDERS), help=f"any of {', '.join(BUILDERS)} (default: all)")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8000)
+        parser.add_argument("--unix-socket", help="listen on this Unix socket instead of TCP")
+        parser.add_argument("--max-concurrency", type=int, default=16, help="requests served at once")
+        parser.add_argument("--no-warm-up", action="store_true", help="build each chain on its first request instead")
+        args = parser.parse_args()
+        unknown = [name for name in args.services if name not in BUILDERS]
+        if unknown:
+            raise ValueError(f"Unknown service(s): {', '.join(unknown)}")
+
+        serve(args.services, args.host, args.port, args.unix_socket, args.max_concurrency, warm=not args.no_warm_up)
+
+    except ValueError as ve:
+        return str(ve)
+
+if __name__ == "__main__":
+    sys.exit(main())
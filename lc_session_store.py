@@ -0,0 +1,166 @@
+# Bounded, optionally persistent chat session store for RunnableWithMessageHistory
+import os, json, time, sqlite3, threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+# Durable tier: one row per message, shareable between worker processes. Only the newest
+# `max_messages` rows of a session are kept, and `purge` drops sessions nobody has written
+# to for a while, so sessions evicted from memory do not grow the file without bound.
+class SQLiteMessageTier:
+    def __init__(self, path: str, max_messages: Optional[int] = None):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, message TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq)")
+        # Wall-clock time of each session's last append; sessions of older files start their TTL now
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, last_write REAL NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO sessions SELECT DISTINCT session_id, ? FROM messages", (time.time(),))
+        self._conn.commit()
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> int:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, message) VALUES (?, ?)",
+                [(session_id, json.dumps(message_to_dict(message), ensure_ascii=False)) for message in messages],
+            )
+            if self.max_messages is not None:
+                # Rows older than the newest `max_messages` can never be loaded again
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq < ("
+                    "SELECT seq FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.max_messages - 1),
+                )
+            self._conn.execute("INSERT OR REPLACE INTO sessions (session_id, last_write) VALUES (?, ?)", (session_id, time.time()))
+            self._conn.commit()
+            return self._last_seq(session_id)
+
+    def _last_seq(self, session_id: str) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def last_seq(self, session_id: str) -> int:
+        with self._lock:
+            return self._last_seq(session_id)
+
+    def load(self, session_id: str, limit: int) -> tuple:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, message FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?", (session_id, limit)
+            ).fetchall()
+        rows.reverse()
+        last_seq = rows[-1][0] if rows else 0
+        return messages_from_dict([json.loads(message) for _, message in rows]), last_seq
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    # Deletes the sessions last written before `before` (time.time()), except those in `keep`;
+    # returns how many were deleted
+    def purge(self, before: float, keep: Iterable[str] = ()) -> int:
+        keep = set(keep)
+        with self._lock:
+            stale = [(session_id,) for session_id, in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_write < ?", (before,)
+            ) if session_id not in keep]
+            self._conn.executemany("DELETE FROM messages WHERE session_id = ?", stale)
+            self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", stale)
+            self._conn.commit()
+        return len(stale)
+
+# In-memory history holding at most `max_messages` (oldest dropped first),
+# writing through to the durable tier when there is one
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id: str, max_messages: int, tier: Optional[SQLiteMessageTier] = None):
+        self.session_id = session_id
+        self.max_messages = max_messages
+        self.tier = tier
+        self.last_seq = 0
+        self._messages: List[BaseMessage] = []
+        if tier is not None:
+            self._messages, self.last_seq = tier.load(session_id, max_messages)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return list(self._messages)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        if self.tier is not None:
+            self.last_seq = self.tier.append(self.session_id, messages)
+        self._messages.extend(messages)
+        del self._messages[:-self.max_messages]
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def clear(self) -> None:
+        if self.tier is not None:
+            self.tier.clear(self.session_id)
+        self._messages = []
+        self.last_seq = 0
+
+# Hot LRU cache of session histories: idle sessions expire after `ttl` seconds and
+# only `max_sessions` are kept in memory. With `path` set, evicted or restarted
+# sessions are reloaded from SQLite, and a session appended to by another process is
+# reloaded on its next access. Every `purge_interval` seconds, sessions idle in SQLite for
+# longer than `ttl` are deleted there too. Use `store.get_session_history` as the factory
+# for RunnableWithMessageHistory.
+class SessionStore:
+    def __init__(self, max_sessions: int = 1000, ttl: Optional[float] = 3600.0, max_messages: int = 100, path: Optional[str] = None,
+                 purge_interval: float = 60.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.purge_interval = purge_interval
+        self.tier = SQLiteMessageTier(path, max_messages) if path else None
+        self.purged = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            while self._sessions:
+                session_id, (_, last_access) = next(iter(self._sessions.items()))
+                if now - last_access <= self.ttl:
+                    break
+                del self._sessions[session_id]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            history = entry[0] if entry else None
+            if history is not None and self.tier is not None and self.tier.last_seq(session_id) != history.last_seq:
+                history = None
+            if history is None:
+                history = BoundedChatMessageHistory(session_id, self.max_messages, self.tier)
+            # Re-inserting keeps the OrderedDict sorted by last access
+            self._sessions[session_id] = (history, now)
+            self._evict(now)
+            if self.tier is not None and self.ttl is not None and now - self._last_purge >= self.purge_interval:
+                self._last_purge = now
+                # Sessions still in memory were used within the TTL even if not written to
+                self.purged += self.tier.purge(time.time() - self.ttl, keep=self._sessions)
+        return history
+
+    def __getitem__(self, session_id: str) -> BaseChatMessageHistory:
+        return self.get_session_history(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,89 @@
+# Read-only SQLite connection pool with async execution, timeouts and cancellation
+import os, time, queue, sqlite3, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from langchain_core.pydantic_v1 import Field
+from langchain_core.tools import BaseTool
+
+# A fixed set of `mode=ro` connections served to a thread pool of the same size,
+# so concurrent questions read the database in parallel instead of queueing on one
+# engine. Every query gets a deadline and a cancel flag that SQLite's progress
+# handler checks every `check_every` VM steps, aborting long or abandoned queries.
+# `wal=True` switches the file to WAL once (a persistent change to the file) so
+# readers also run alongside a writer; a read-only workload does not need it.
+class ReadOnlySQLitePool:
+    def __init__(self, path: str, size: int = 4, timeout: float = 10.0, wal: bool = False, check_every: int = 1000):
+        self.path = os.path.abspath(path)
+        self.size = size
+        self.timeout = timeout
+        self.check_every = check_every
+        if wal:
+            with sqlite3.connect(self.path) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+        self._connections = queue.Queue()
+        for _ in range(size):
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute("PRAGMA query_only=1")
+            self._connections.put(connection)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite-ro")
+
+    def _execute(self, sql: str, timeout: Optional[float], cancelled: threading.Event) -> list:
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        connection = self._connections.get()
+        try:
+            connection.set_progress_handler(lambda: int(cancelled.is_set() or time.monotonic() > deadline), self.check_every)
+            try:
+                return connection.execute(sql).fetchall()
+            except sqlite3.OperationalError as e:
+                if "interrupted" not in str(e):
+                    raise
+                if cancelled.is_set():
+                    # Cancelled by arun(); nobody is waiting for the result any more
+                    return []
+                raise TimeoutError(f"Query exceeded {self.timeout if timeout is None else timeout}s") from None
+            finally:
+                connection.set_progress_handler(None, 0)
+        finally:
+            self._connections.put(connection)
+
+    def run(self, sql: str, timeout: Optional[float] = None) -> list:
+        return self._executor.submit(self._execute, sql, timeout, threading.Event()).result()
+
+    async def arun(self, sql: str, timeout: Optional[float] = None) -> list:
+        cancelled = threading.Event()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._execute, sql, timeout, cancelled)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The caller gave up: stop the query in SQLite instead of letting it run on
+            cancelled.set()
+            raise
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get().close()
+
+def format_result(rows: list) -> str:
+    return str([tuple(row) for row in rows]) if rows else ""
+
+# Drop-in for QuerySQLDataBaseTool that executes on a ReadOnlySQLitePool and supports ainvoke
+class QueryReadOnlySQLTool(BaseTool):
+    name: str = "sql_db_query"
+    description: str = (
+        "Execute a SQL query against the database and get back the result. "
+        "If the query is not correct, an error message will be returned."
+    )
+    pool: Any = Field(exclude=True)
+
+    def _run(self, query: str, run_manager=None) -> str:
+        try:
+            return format_result(self.pool.run(query))
+        except (sqlite3.Error, TimeoutError) as e:
+            return f"Error: {e}"
+
+    async def _arun(self, query: str, run_manager=None) -> str:
+        try:
+            return format_result(await self.pool.arun(query))
+        except (sqlite3.Error, TimeoutError) as e:
+            return f"Error: {e}"
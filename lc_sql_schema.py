@@ -0,0 +1,93 @@
+# Cached schema introspection and relevant-table selection for the SQL chain
+import re, threading
+from typing import List, Optional
+from sqlalchemy import text
+from langchain_community.utilities import SQLDatabase
+
+# SQLDatabase whose rendered table info (DDL + sample rows) is built once per table set
+# and reused until the schema changes. For SQLite the change check is a single
+# `PRAGMA schema_version`; on a change the tables are re-reflected and the cache is dropped.
+class CachedSQLDatabase(SQLDatabase):
+    def __init__(self, engine, **kwargs):
+        super().__init__(engine, **kwargs)
+        self._init_kwargs = kwargs
+        self._table_info_cache = {}
+        self._cache_lock = threading.Lock()
+        self._schema_version = self._read_schema_version()
+
+    def _read_schema_version(self) -> Optional[int]:
+        if self.dialect != "sqlite":
+            return None
+        with self._engine.connect() as connection:
+            return connection.execute(text("PRAGMA schema_version")).scalar()
+
+    def refresh_if_changed(self) -> Optional[int]:
+        current = self._read_schema_version()
+        if current != self._schema_version:
+            with self._cache_lock:
+                super().__init__(self._engine, **self._init_kwargs)
+                self._table_info_cache.clear()
+                self._schema_version = current
+        return self._schema_version
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self.refresh_if_changed()
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        self.refresh_if_changed()
+        key = tuple(sorted(table_names)) if table_names else None
+        with self._cache_lock:
+            if key in self._table_info_cache:
+                return self._table_info_cache[key]
+        info = super().get_table_info(table_names)
+        with self._cache_lock:
+            self._table_info_cache[key] = info
+        return info
+
+# Picks the tables relevant to a question with a small embedding index over each
+# table's DDL, plus the tables they reference through foreign keys so joins still work.
+# Pass the result as `table_names_to_use` to create_sql_query_chain.
+class TableSelector:
+    def __init__(self, db: SQLDatabase, embed, k: int = 3, follow_foreign_keys: bool = True):
+        self.db = db
+        self.embed = embed
+        self.k = k
+        self.follow_foreign_keys = follow_foreign_keys
+        self._version = object()
+        self._lock = threading.Lock()
+
+    def _build(self):
+        self.tables = sorted(self.db.get_usable_table_names())
+        self.ddl = {}
+        self.references = {}
+        for table in self.tables:
+            # Table info is "CREATE TABLE ...\n\n/*\nN rows from ...*/"; only the DDL describes the table
+            ddl = self.db.get_table_info([table]).split("/*")[0].strip()
+            self.ddl[table] = ddl
+            self.references[table] = [ref for ref in re.findall(r'REFERENCES\s+"?(\w+)"?', ddl) if ref != table]
+        vectors = self.embed.embed_documents([self.ddl[table] for table in self.tables])
+        self.vectors = [self._normalize(vector) for vector in vectors]
+
+    @staticmethod
+    def _normalize(vector):
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def _ensure_index(self):
+        version = getattr(self.db, "schema_version", None)
+        with self._lock:
+            if version != self._version:
+                self._build()
+                self._version = version
+
+    def select(self, question: str) -> List[str]:
+        self._ensure_index()
+        query = self._normalize(self.embed.embed_query(question))
+        scores = [sum(a * b for a, b in zip(query, vector)) for vector in self.vectors]
+        ranked = sorted(range(len(self.tables)), key=lambda i: scores[i], reverse=True)
+        selected = [self.tables[i] for i in ranked[:self.k]]
+        if self.follow_foreign_keys:
+            for table in list(selected):
+                selected.extend(ref for ref in self.references[table] if ref in self.ddl and ref not in selected)
+        return selected
@@ -1,71 +1,84 @@
 ##### Build a Question/Answering system over SQL data #####
-import sys, json
-from langchain_openai import AzureChatOpenAI
+import sys, asyncio
+from lc_clients import chat_model, embeddings
 from langchain.chains import create_sql_query_chain
-from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
-from langchain_community.utilities import SQLDatabase
+from lc_sql_pool import ReadOnlySQLitePool, QueryReadOnlySQLTool
+from lc_embed_cache import CachedEmbeddings
+from lc_sql_schema import CachedSQLDatabase, TableSelector
 from operator import itemgetter
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 
+answer_prompt = PromptTemplate.from_template(
+    """Given the following user question, corresponding SQL query, and SQL result, answer the user question.
 
-###### Azure OpenAI Settings #######
-with open('param.json', 'r', encoding='utf-8') as param_file:
-    param_data = json.load(param_file)
-    azure_apikey = param_data["azure_apikey"]
-    azure_apibase  = param_data["azure_apibase"]
-    azure_apitype = param_data["azure_apitype"]
-    azure_apiversion = param_data["azure_apiversion"]
-    azure_gptx_deployment = param_data["azure_gptx_deployment"]
-    azure_embd_deployment = param_data["azure_embd_deployment"]
-param_file.close()
-####################################
+Question: {question}
+SQL Query: {query}
+SQL Result: {result}
+Answer: """
+)
+
+# Question -> SQL -> result -> natural-language answer; shared by main() and lc_server
+def build_answer_chain(model, db, select_tables, pool):
+    write_query = select_tables | create_sql_query_chain(model, db)
+    execute_query = QueryReadOnlySQLTool(pool=pool)
+    return (
+        RunnablePassthrough.assign(query=write_query).assign(
+            result=itemgetter("query") | execute_query
+        )
+        | answer_prompt
+        | model
+        | StrOutputParser()
+    )
 
 def main():
     try:
         print("Hello, LangChain SQLite!")
 
-        model = AzureChatOpenAI(deployment_name=azure_gptx_deployment, openai_api_version=azure_apiversion, openai_api_key=azure_apikey, azure_endpoint=azure_apibase, temperature=0.9)
-        db = SQLDatabase.from_uri("sqlite:///data/Chinook.db")
+        model = chat_model(temperature=0.9)
+        embed = CachedEmbeddings(embeddings())
+        # Table info is rendered once and reused until the schema changes
+        db = CachedSQLDatabase.from_uri("sqlite:///data/Chinook.db")
+        # Only the tables relevant to the question (and their foreign-key neighbours) go into the prompt
+        selector = TableSelector(db, embed)
+        select_tables = RunnablePassthrough.assign(table_names_to_use=RunnableLambda(lambda x: selector.select(x["question"])))
+        # Generated SQL runs on a pool of read-only connections with a per-query timeout
+        pool = ReadOnlySQLitePool("data/Chinook.db", size=4, timeout=10.0)
 
         run_option = 2      
         match run_option:
             case 0:
-                chain = create_sql_query_chain(model, db)
+                chain = select_tables | create_sql_query_chain(model, db)
                 response = chain.invoke({"question": "How many employees are there"})
                 print(response)
                 print(db.run(response))
                 print(chain.get_prompts()[0].pretty_print())
 
             case 1:
-                write_query = create_sql_query_chain(model, db)
-                execute_query = QuerySQLDataBaseTool(db=db)
+                write_query = select_tables | create_sql_query_chain(model, db)
+                execute_query = QueryReadOnlySQLTool(pool=pool)
                 chain = write_query | execute_query
                 response = chain.invoke({"question": "How many employees are there"})
                 print(response)
             case 2:
-                answer_prompt = PromptTemplate.from_template(
-                    """Given the following user question, corresponding SQL query, and SQL result, answer the user question.
-
-                Question: {question}
-                SQL Query: {query}
-                SQL Result: {result}
-                Answer: """
-                )
-                write_query = create_sql_query_chain(model, db)
-                execute_query = QuerySQLDataBaseTool(db=db)
-                chain = (
-                    RunnablePassthrough.assign(query=write_query).assign(
-                        result=itemgetter("query") | execute_query
-                    )
-                    | answer_prompt
-                    | model
-                    | StrOutputParser()
-                )
+                chain = build_answer_chain(model, db, select_tables, pool)
 
                 response = chain.invoke({"question": "How many employees are there"})
                 print(response)
+            case 3:
+                # Concurrent questions: the queries run in parallel on the read-only pool
+                write_query = select_tables | create_sql_query_chain(model, db)
+                execute_query = QueryReadOnlySQLTool(pool=pool)
+                chain = write_query | execute_query
+                questions = [
+                    {"question": "How many employees are there"},
+                    {"question": "How many tracks are longer than five minutes"},
+                    {"question": "Which country has the most customers"},
+                ]
+                responses = asyncio.run(chain.abatch(questions))
+                for question, response in zip(questions, responses):
+                    print(f'{question["question"]}: {response}')
             case _:
                 print(f'Error: Wrong run_option({run_option})!')
 
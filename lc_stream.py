@@ -0,0 +1,104 @@
+# Token-level streaming for LangGraph apps with latency metrics
+import sys, time, asyncio
+from typing import Any, Callable, Optional, Sequence
+
+# Per-run latency figures: time to first token, token throughput and time spent in each graph node
+class StreamMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.last_token = None
+        self.end = None
+        self.tokens = 0
+        self.nodes = {}
+        self._node_starts = {}
+
+    def on_token(self):
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        self.last_token = now
+        self.tokens += 1
+
+    # Only the outermost run of a node is timed: a runnable inside it that carries the node's
+    # name (the "tools" lambda of lc_tool_node, say) would otherwise count the time twice
+    def on_node_start(self, run_id: str, parent_ids: Sequence[str] = ()):
+        if any(parent in self._node_starts for parent in parent_ids):
+            return
+        self._node_starts[run_id] = time.perf_counter()
+
+    def on_node_end(self, run_id: str, node: str):
+        started = self._node_starts.pop(run_id, None)
+        if started is None:
+            return
+        stats = self.nodes.setdefault(node, {"calls": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] += time.perf_counter() - started
+
+    def summary(self) -> dict:
+        end = self.end or time.perf_counter()
+        streaming = (self.last_token - self.first_token) if self.first_token is not None else 0.0
+        return {
+            "ttft_seconds": (self.first_token - self.start) if self.first_token is not None else None,
+            "total_seconds": end - self.start,
+            "tokens": self.tokens,
+            # Rate over the streaming window; the first token only marks its start
+            "tokens_per_second": (self.tokens - 1) / streaming if streaming > 0 else None,
+            "nodes": self.nodes,
+        }
+
+def _print_token(text: str):
+    print(text, end="", flush=True)
+
+# Runs `app` with astream_events and hands every chat-model token to `on_token` as it is
+# generated, in any node (chat models stream automatically while events are observed).
+# `nodes` limits which graph nodes are timed; by default every node the graph reports.
+async def astream_graph(app, inputs: dict, config: Optional[dict] = None, on_token: Callable[[str], None] = _print_token,
+                        nodes: Optional[Sequence[str]] = None) -> tuple:
+    metrics = StreamMetrics()
+    final_state = None
+    async for event in app.astream_events(inputs, config=config, version="v2"):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+        if kind == "on_chat_model_stream":
+            text = event["data"]["chunk"].content
+            if text:
+                metrics.on_token()
+                on_token(text)
+        elif kind == "on_chain_start" and node is not None and event["name"] == node and (nodes is None or node in nodes):
+            metrics.on_node_start(event["run_id"], event.get("parent_ids", ()))
+        elif kind == "on_chain_end":
+            if node is not None and event["name"] == node:
+                metrics.on_node_end(event["run_id"], node)
+            elif not event.get("parent_ids"):
+                # The outermost run is the graph itself; its output is the final state
+                final_state = event["data"].get("output")
+    metrics.end = time.perf_counter()
+    return final_state, metrics.summary()
+
+def stream_graph(app, inputs: dict, config: Optional[dict] = None, on_token: Callable[[str], None] = _print_token,
+                 nodes: Optional[Sequence[str]] = None) -> tuple:
+    return asyncio.run(astream_graph(app, inputs, config, on_token, nodes))
+
+def print_metrics(metrics: dict, file=sys.stdout):
+    ttft = metrics["ttft_seconds"]
+    rate = metrics["tokens_per_second"]
+    print(f"\nTTFT: {ttft:.3f}s" if ttft is not None else "\nTTFT: n/a", end="", file=file)
+    print(f" | total: {metrics['total_seconds']:.3f}s | tokens: {metrics['tokens']}", end="", file=file)
+    print(f" | {rate:.1f} tokens/s" if rate is not None else "", file=file)
+    for node, stats in metrics["nodes"].items():
+        print(f"  {node}: {stats['calls']} call(s), {stats['seconds']:.3f}s", file=file)
+
+# Runs several turns of one conversation in a single event loop, so the async connection pools
+# and the checkpointer's threads are shared by all of them. `on_turn(final_state, metrics)` is
+# called as each turn finishes; the (final_state, metrics) of every turn are returned.
+def stream_graph_turns(app, turns: Sequence[dict], config: Optional[dict] = None, on_token: Callable[[str], None] = _print_token,
+                       nodes: Optional[Sequence[str]] = None, on_turn: Optional[Callable[[Any, dict], None]] = None) -> list:
+    async def run() -> list:
+        results = []
+        for inputs in turns:
+            results.append(await astream_graph(app, inputs, config, on_token, nodes))
+            if on_turn is not None:
+                on_turn(*results[-1])
+        return results
+    return asyncio.run(run())
@@ -0,0 +1,122 @@
+# TTL result cache for tools such as WikipediaQueryRun
+import os, re, time, sqlite3, threading, unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+from langchain_core.pydantic_v1 import Field
+from langchain_core.tools import BaseTool
+
+# "  Who is the Mayor of Taoyuan City? " and "who is the mayor of taoyuan city" share a key.
+# Only case, width, spacing and trailing ?!. are folded: "C++", "C#" and "C", or "3.14"
+# and "3 14", are different searches.
+def normalize_query(query: str) -> str:
+    query = " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+    return re.sub(r"[\s?!.。]+$", "", query)
+
+# Wikipedia's answer when nothing matched; often a typo or a page not written yet, so it is not kept
+def is_cacheable(result: str) -> bool:
+    return not result.startswith("No good Wikipedia Search Result")
+
+# Two-tier cache of tool results: an in-memory LRU of `max_entries` in front of an
+# optional SQLite file, both honouring `ttl`. Concurrent misses for the same key are
+# coalesced: the first caller fetches and the others wait for its result. Results that
+# `cacheable` rejects are shared with those waiters but not stored.
+class ToolResultCache:
+    def __init__(self, ttl: float = 24 * 3600.0, max_entries: int = 1000, path: Optional[str] = None,
+                 cacheable: Callable[[str], bool] = is_cacheable):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._memory = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._conn.commit()
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._memory.move_to_end(key)
+                return entry[0]
+            del self._memory[key]
+        if self._conn is not None:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return None
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], str]) -> str:
+        now = time.time()
+        with self._lock:
+            value = self._get(key, now)
+            if value is not None:
+                self.hits += 1
+                return value
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        expires_at = time.time() + self.ttl
+        keep = self.cacheable(value)
+        with self._lock:
+            if keep:
+                self._remember(key, value, expires_at)
+            if keep and self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+                self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+                self._conn.commit()
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self._memory)}
+
+# Tool with the same name, description and arguments as `tool`, answering from a ToolResultCache
+class CachedTool(BaseTool):
+    tool: BaseTool
+    cache: Any = Field(exclude=True)
+
+    def _run(self, query: str, run_manager=None) -> str:
+        return self.cache.get_or_fetch(f"{self.tool.name}:{normalize_query(query)}", lambda: self.tool.run(query))
+
+def cached_tool(tool: BaseTool, ttl: float = 24 * 3600.0, max_entries: int = 1000, path: Optional[str] = None,
+                cacheable: Callable[[str], bool] = is_cacheable) -> CachedTool:
+    return CachedTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        tool=tool,
+        cache=ToolResultCache(ttl=ttl, max_entries=max_entries, path=path, cacheable=cacheable),
+    )
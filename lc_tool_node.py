@@ -0,0 +1,114 @@
+# LangGraph tools node that runs a turn's tool calls concurrently
+import time, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Sequence
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+# One tool call's share of the `max_concurrency` slots. The slot is given back when the call
+# finishes or, if it hangs, once its `timeout` has passed. The timer runs with the call
+# rather than in the caller, which collects results in call order: the semaphore is not
+# FIFO, so a later call may hold the slot an earlier one is waiting for.
+class _Slot:
+    def __init__(self, semaphore: threading.Semaphore, timeout: float):
+        self.semaphore = semaphore
+        self.timeout = timeout
+        self.started = threading.Event()
+        self.started_at = None
+        self._released = False
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self.semaphore.acquire()
+        self.started_at = time.monotonic()
+        with self._lock:
+            self._timer = threading.Timer(self.timeout, self.release)
+            self._timer.daemon = True
+            self._timer.start()
+        self.started.set()
+
+    def release(self):
+        with self._lock:
+            if not self._released:
+                self._released = True
+                if self._timer is not None:
+                    self._timer.cancel()
+                self.semaphore.release()
+
+# Drop-in for ToolNode(tools) on a MessagesState graph. All tool calls of the last
+# AIMessage run at once (at most `max_concurrency`), each bounded by its tool's entry in
+# `timeouts` or `default_timeout` seconds, counted from the moment the call gets a slot
+# (sync and async alike). A failing or timed-out call becomes an error ToolMessage rather
+# than failing the turn, and messages come back in the call order, so a turn takes as
+# long as its slowest call instead of the sum of all of them.
+def create_concurrent_tool_node(tools: Sequence[BaseTool], max_concurrency: int = 4, timeouts: Optional[Dict[str, float]] = None,
+                                default_timeout: float = 30.0) -> Runnable:
+    tools_by_name = {tool.name: tool for tool in tools}
+    timeouts = timeouts or {}
+
+    def tool_calls(state: dict) -> list:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage):
+            raise ValueError("Last message is not an AIMessage")
+        return message.tool_calls
+
+    def error_message(call: dict, error: str) -> ToolMessage:
+        return ToolMessage(content=f"Error: {error}", name=call["name"], tool_call_id=call["id"])
+
+    def run_one(call: dict, config: RunnableConfig, slot: _Slot) -> ToolMessage:
+        slot.acquire()
+        try:
+            if call["name"] not in tools_by_name:
+                return error_message(call, f"{call['name']} is not a valid tool")
+            output = tools_by_name[call["name"]].invoke(call["args"], config)
+            return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+        finally:
+            slot.release()
+
+    def run(state: dict, config: RunnableConfig) -> dict:
+        calls = tool_calls(state)
+        semaphore = threading.Semaphore(max_concurrency)
+        slots = [_Slot(semaphore, timeouts.get(call["name"], default_timeout)) for call in calls]
+        # One thread per call; the semaphore, not the pool size, bounds how many run at once
+        executor = ThreadPoolExecutor(max_workers=max(1, len(calls)))
+        try:
+            futures = [executor.submit(run_one, call, config, slot) for call, slot in zip(calls, slots)]
+            messages = []
+            for call, future, slot in zip(calls, futures, slots):
+                timeout = slot.timeout
+                # Time spent waiting for a slot does not count against the call's timeout; every
+                # slot is freed within its call's timeout, so the wait ends
+                slot.started.wait()
+                try:
+                    messages.append(future.result(timeout=max(0.0, slot.started_at + timeout - time.monotonic())))
+                except FutureTimeoutError:
+                    slot.release()
+                    messages.append(error_message(call, f"{call['name']} timed out after {timeout}s"))
+                except Exception as e:
+                    messages.append(error_message(call, f"{type(e).__name__}: {e}"))
+        finally:
+            # Do not wait for timed-out calls still running in their threads
+            executor.shutdown(wait=False)
+        return {"messages": messages}
+
+    async def arun_one(call: dict, config: RunnableConfig, semaphore: asyncio.Semaphore) -> ToolMessage:
+        if call["name"] not in tools_by_name:
+            return error_message(call, f"{call['name']} is not a valid tool")
+        timeout = timeouts.get(call["name"], default_timeout)
+        async with semaphore:
+            try:
+                output = await asyncio.wait_for(tools_by_name[call["name"]].ainvoke(call["args"], config), timeout)
+            except asyncio.TimeoutError:
+                return error_message(call, f"{call['name']} timed out after {timeout}s")
+            except Exception as e:
+                return error_message(call, f"{type(e).__name__}: {e}")
+        return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+    async def arun(state: dict, config: RunnableConfig) -> dict:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        messages = await asyncio.gather(*(arun_one(call, config, semaphore) for call in tool_calls(state)))
+        return {"messages": list(messages)}
+
+    return RunnableLambda(run, afunc=arun, name="tools")
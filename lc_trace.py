@@ -0,0 +1,245 @@
+# Per-stage tracing for chains and graphs: latency, tokens, cache hits and retries
+import json, time, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Stage kind of a chain run from its name; prompts and parsers run as chains
+def _chain_kind(name: str) -> str:
+    if name.endswith("PromptTemplate"):
+        return "prompt"
+    if name.endswith("Parser"):
+        return "parser"
+    return "chain"
+
+def _run_name(serialized: Optional[dict], kwargs: dict) -> str:
+    if kwargs.get("name"):
+        return kwargs["name"]
+    serialized = serialized or {}
+    return serialized.get("name") or (serialized.get("id") or ["unknown"])[-1]
+
+# Prompt and completion tokens of an LLM result: usage_metadata on chat messages when
+# the provider reports it, else the OpenAI-style token_usage in llm_output
+def _token_usage(response: LLMResult) -> tuple:
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = usage.get("prompt_tokens", 0)
+        completion = usage.get("completion_tokens", 0)
+    return prompt, completion
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+# Callback handler for any chain, agent or graph, passed as
+# `config={"callbacks": [tracer]}`. Every retriever, prompt, model, parser, tool and
+# chain run becomes a span {run_id, parent_id, kind, name, node, seconds, ...}; spans are
+# appended to `path` as JSON lines when it is set and aggregated per (kind, name) for
+# `prometheus_text()`. Cache hits and retries that happen below the callback layer
+# (CachedEmbeddings, SQLiteLRUCache, ConcurrentEmbeddings, ToolResultCache, ...) are
+# read from the objects registered with `watch()` at export time.
+class StageTracer(BaseCallbackHandler):
+    def __init__(self, path: Optional[str] = None, keep_spans: int = 1000):
+        self.path = path
+        self.keep_spans = keep_spans
+        self.spans = []
+        self.stages = {}
+        self.sources = {}
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    # `source` is an object with stats() or a callable returning a dict of numbers
+    def watch(self, name: str, source: Any):
+        self.sources[name] = source.stats if hasattr(source, "stats") else source
+        return self
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str, metadata: Optional[dict]):
+        with self._lock:
+            self._runs[run_id] = {
+                "run_id": str(run_id),
+                "parent_id": str(parent_run_id) if parent_run_id else None,
+                "kind": kind,
+                "name": name,
+                "node": (metadata or {}).get("langgraph_node"),
+                "start": time.time(),
+                "perf": time.perf_counter(),
+                "retries": 0,
+            }
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **fields):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            seconds = time.perf_counter() - run.pop("perf")
+            span = {**run, "seconds": round(seconds, 6), **fields}
+            if error is not None:
+                span["error"] = f"{type(error).__name__}: {error}"
+            stage = self.stages.setdefault((span["kind"], span["name"]), {
+                "calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "retries": 0,
+            })
+            stage["calls"] += 1
+            stage["errors"] += error is not None
+            stage["seconds"] += seconds
+            stage["max_seconds"] = max(stage["max_seconds"], seconds)
+            stage["prompt_tokens"] += span.get("prompt_tokens", 0)
+            stage["completion_tokens"] += span.get("completion_tokens", 0)
+            stage["retries"] += span["retries"]
+            self.spans.append(span)
+            del self.spans[:-self.keep_spans]
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as trace_file:
+                    trace_file.write(json.dumps(span, ensure_ascii=False) + "\n")
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = _run_name(serialized, kwargs)
+        self._start(run_id, parent_run_id, _chain_kind(name), name, metadata)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, "model", _run_name(serialized, kwargs), metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, "model", _run_name(serialized, kwargs), metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, "retriever", _run_name(serialized, kwargs), metadata)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, "tool", _run_name(serialized, kwargs), metadata)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # Raised by Runnable.with_retry before each new attempt
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                run["retries"] += 1
+
+    def source_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for name, source in self.sources.items():
+            try:
+                stats[name] = source()
+            except Exception:
+                continue
+        return stats
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = [{"kind": kind, "name": name, **stage} for (kind, name), stage in self.stages.items()]
+        # Slowest stages first: that is where a request spends its time
+        stages.sort(key=lambda stage: stage["seconds"], reverse=True)
+        return {"stages": stages, "sources": self.source_stats()}
+
+    def prometheus_text(self, prefix: str = "lc") -> str:
+        with self._lock:
+            stages = dict(self.stages)
+        lines = [
+            f"# TYPE {prefix}_stage_seconds summary",
+            f"# TYPE {prefix}_stage_max_seconds gauge",
+            f"# TYPE {prefix}_stage_errors_total counter",
+            f"# TYPE {prefix}_stage_retries_total counter",
+            f"# TYPE {prefix}_tokens_total counter",
+        ]
+        for (kind, name), stage in sorted(stages.items()):
+            labels = _labels(kind=kind, name=name)
+            lines.append(f"{prefix}_stage_seconds_sum{labels} {stage['seconds']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{labels} {stage['calls']}")
+            lines.append(f"{prefix}_stage_max_seconds{labels} {stage['max_seconds']:.6f}")
+            lines.append(f"{prefix}_stage_errors_total{labels} {stage['errors']}")
+            lines.append(f"{prefix}_stage_retries_total{labels} {stage['retries']}")
+            if kind == "model":
+                lines.append(f"{prefix}_tokens_total{_labels(name=name, type='prompt')} {stage['prompt_tokens']}")
+                lines.append(f"{prefix}_tokens_total{_labels(name=name, type='completion')} {stage['completion_tokens']}")
+        # Watched sources: hits, misses, retries, ... exported as-is, one gauge per key
+        for source, stats in sorted(self.source_stats().items()):
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"{prefix}_{key}{_labels(source=source)} {value}")
+        return "\n".join(lines) + "\n"
+
+# Serves `tracer.prometheus_text()` at /metrics and `tracer.summary()` at /stats from a daemon thread
+class MetricsServer:
+    def __init__(self, tracer: StageTracer, host: str = "127.0.0.1", port: int = 9464):
+        self.tracer = tracer
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        tracer = self.tracer
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracer.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path == "/stats":
+                    body, content_type = json.dumps(tracer.summary(), ensure_ascii=False).encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
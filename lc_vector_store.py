@@ -0,0 +1,339 @@
+# In-process NumPy vector store: contiguous (optionally quantized) matrices, batched top-k, memory-mapped persistence
+import os, json, uuid, threading
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+DTYPES = ("float32", "float16", "int8")
+# Rows converted to float32 at a time while scoring a quantized matrix
+BLOCK_ROWS = 16384
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+# Symmetric per-row int8 quantization: row ~= codes * scale
+def _quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def _matches(metadata: dict, filter: Optional[dict]) -> bool:
+    return not filter or all(metadata.get(key) == value for key, value in filter.items())
+
+# Cosine-similarity vector store for corpora that fit in memory, with the same retriever
+# interface as Chroma (as_retriever, similarity_search*, add_documents, delete, get).
+#
+# Vectors are L2-normalized and kept in one contiguous (n, dim) matrix of `dtype`:
+# float32, float16 (half the memory) or int8 with a per-row scale (a quarter). Queries are
+# scored in blocks with a single matrix multiply per block, so a batch of queries costs
+# about as much as one. With `rescore` > 0 a quantized store also keeps float32 rows and
+# re-ranks its best `k * rescore` candidates against them (int8 recall goes from ~0.99 to 1).
+#
+# save(path) writes plain .npy files; load(path) memory-maps them, so opening an index
+# is near-instant. Build with rescore, save, then load: only the quantized matrix stays
+# resident and the float32 rows are read from disk for the shortlisted candidates alone.
+class NumpyVectorStore(VectorStore):
+    def __init__(self, embedding: Embeddings, dtype: str = "float32", rescore: int = 0):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(DTYPES)}, not {dtype!r}")
+        self.embedding = embedding
+        self.dtype = dtype
+        self.rescore = rescore if dtype != "float32" else 0
+        self.dim = None
+        self._ids = []
+        self._docs = []
+        self._rows = {}
+        self._count = 0
+        self._matrix = None
+        self._scales = None
+        self._full = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Resident size of the vectors, excluding memory-mapped float32 rows on disk
+    def nbytes(self) -> int:
+        total = 0
+        for array in (self._matrix, self._scales, self._full):
+            if array is not None and not isinstance(array, np.memmap):
+                total += array[:self._count].nbytes
+        return total
+
+    def _reserve(self, extra: int):
+        # Grow by doubling so appends stay amortized O(1); memory-mapped arrays become writable copies
+        needed = self._count + extra
+        capacity = 0 if self._matrix is None else len(self._matrix)
+        if needed <= capacity and not isinstance(self._matrix, np.memmap):
+            return
+        capacity = max(needed, 2 * capacity, 64)
+
+        def grow(array, shape, dtype):
+            grown = np.empty(shape, dtype=dtype)
+            if array is not None and self._count:
+                grown[:self._count] = array[:self._count]
+            return grown
+        self._matrix = grow(self._matrix, (capacity, self.dim), self.dtype)
+        if self.dtype == "int8":
+            self._scales = grow(self._scales, (capacity,), np.float32)
+        if self.rescore:
+            self._full = grow(self._full, (capacity, self.dim), np.float32)
+
+    def _store(self, rows: slice, vectors: np.ndarray):
+        if self.dtype == "int8":
+            self._matrix[rows], self._scales[rows] = _quantize_int8(vectors)
+        else:
+            self._matrix[rows] = vectors.astype(self.dtype)
+        if self.rescore:
+            self._full[rows] = vectors
+
+    def add_vectors(self, vectors: Sequence[Sequence[float]], documents: Sequence[Document], ids: Optional[Sequence[str]] = None) -> List[str]:
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+        if len(ids) != len(documents) or len(vectors) != len(documents):
+            raise ValueError("vectors, documents and ids must have the same length")
+        if not ids:
+            return []
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            # Existing ids are overwritten in place, like an upsert
+            fresh = []
+            for i, doc_id in enumerate(ids):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    fresh.append(i)
+                    continue
+                if isinstance(self._matrix, np.memmap):
+                    self._reserve(0)
+                self._store(slice(row, row + 1), vectors[i:i + 1])
+                self._docs[row] = documents[i]
+            if fresh:
+                self._reserve(len(fresh))
+                start = self._count
+                self._store(slice(start, start + len(fresh)), vectors[fresh])
+                for offset, i in enumerate(fresh):
+                    self._rows[ids[i]] = start + offset
+                    self._ids.append(ids[i])
+                    self._docs.append(documents[i])
+                self._count += len(fresh)
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        return self.add_vectors(self.embedding.embed_documents(texts), documents, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            drop = {self._rows[doc_id] for doc_id in ids if doc_id in self._rows}
+            if not drop:
+                return False
+            keep = np.array([row for row in range(self._count) if row not in drop], dtype=np.int64)
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            if self._scales is not None:
+                self._scales = np.ascontiguousarray(self._scales[keep])
+            if self._full is not None:
+                self._full = np.ascontiguousarray(self._full[keep])
+            self._ids = [self._ids[row] for row in keep]
+            self._docs = [self._docs[row] for row in keep]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._count = len(keep)
+        return True
+
+    # Chroma-style lookup used by lc_pipeline.upsert_stream to skip splits already indexed
+    def get(self, ids: Optional[Sequence[str]] = None, include: Optional[Sequence[str]] = None, **kwargs: Any) -> dict:
+        with self._lock:
+            found = list(self._ids) if ids is None else [doc_id for doc_id in ids if doc_id in self._rows]
+            result = {"ids": found}
+            if include is None or "documents" in include:
+                result["documents"] = [self._docs[self._rows[doc_id]].page_content for doc_id in found]
+            if include is None or "metadatas" in include:
+                result["metadatas"] = [self._docs[self._rows[doc_id]].metadata for doc_id in found]
+        return result
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        with self._lock:
+            rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+            return [Document(page_content=self._docs[row].page_content, metadata=self._docs[row].metadata, id=self._ids[row]) for row in rows]
+
+    def _scores(self, matrix, scales, count: int, queries: np.ndarray) -> np.ndarray:
+        # (count, q) cosine similarities. float32 goes straight to BLAS; quantized rows are
+        # widened a block at a time so the temporary stays small.
+        if self.dtype == "float32":
+            return matrix[:count] @ queries.T
+        scores = np.empty((count, len(queries)), dtype=np.float32)
+        for start in range(0, count, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, count)
+            block = matrix[start:stop].astype(np.float32) @ queries.T
+            if scales is not None:
+                block *= scales[start:stop, None]
+            scores[start:stop] = block
+        return scores
+
+    # Arrays and lists are snapshotted under the lock and scored outside it; delete() replaces
+    # them rather than editing them and adds only append or overwrite a row with the same id,
+    # so rows found in a snapshot stay valid against it.
+    def _snapshot(self) -> tuple:
+        with self._lock:
+            return self._count, self._matrix, self._scales, self._full, self._ids, self._docs
+
+    # float32 copies of the normalized `rows` of a snapshot, full precision when kept
+    @staticmethod
+    def _row_vectors(snapshot: tuple, rows: Sequence[int]) -> np.ndarray:
+        _, matrix, scales, full, _, _ = snapshot
+        rows = np.asarray(rows, dtype=np.int64)
+        if full is not None:
+            return np.asarray(full[rows], dtype=np.float32)
+        vectors = matrix[rows].astype(np.float32)
+        if scales is not None:
+            vectors *= scales[rows, None]
+        return vectors
+
+    # Top-k (row, similarity) pairs for each query vector, best first, plus the ids and
+    # documents those rows index. Similarities are clipped to [-1, 1]: quantized rows can
+    # score slightly past them.
+    def _search(self, query_vectors: Sequence[Sequence[float]], k: int, filter: Optional[dict], snapshot: Optional[tuple] = None) -> tuple:
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1))
+        count, matrix, scales, full, ids, docs = snapshot or self._snapshot()
+        if count == 0:
+            return [[] for _ in queries], ids, docs
+        scores = self._scores(matrix, scales, count, queries)
+        if filter:
+            mask = np.array([_matches(doc.metadata, filter) for doc in docs[:count]])
+            scores[~mask] = -np.inf
+        candidates = min(count, k * self.rescore if self.rescore else k)
+        results = []
+        for q in range(len(queries)):
+            column = scores[:, q]
+            rows = np.argpartition(-column, candidates - 1)[:candidates] if candidates < count else np.arange(count)
+            rows = rows[np.isfinite(column[rows])]
+            if self.rescore and len(rows):
+                # Re-rank the quantized shortlist with full-precision rows
+                # Sorted rows read a memory-mapped matrix front to back
+                rows = np.sort(rows)
+                exact = full[rows] @ queries[q]
+                order = np.argsort(-exact)[:k]
+                results.append([(int(rows[i]), min(1.0, max(-1.0, float(exact[i])))) for i in order])
+            else:
+                order = np.argsort(-column[rows])[:k]
+                results.append([(int(rows[i]), min(1.0, max(-1.0, float(column[rows[i]])))) for i in order])
+        return results, ids, docs
+
+    def search_vectors(self, query_vectors: Sequence[Sequence[float]], k: int = 4, filter: Optional[dict] = None) -> List[List[Tuple[int, float]]]:
+        return self._search(query_vectors, k, filter)[0]
+
+    @staticmethod
+    def _documents(hits: List[Tuple[int, float]], ids: List[str], docs: List[Document]) -> List[Tuple[Document, float]]:
+        return [(Document(page_content=docs[row].page_content, metadata=docs[row].metadata, id=ids[row]), 1.0 - score) for row, score in hits]
+
+    # Scores are cosine distances (lower is closer), as with Chroma's cosine space
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        hits, ids, docs = self._search([embedding], k, filter)
+        return self._documents(hits[0], ids, docs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    # The `fetch_k` nearest rows are re-ranked for diversity with their stored vectors, so
+    # as_retriever(search_type="mmr") needs no second embedding call
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                                                filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        snapshot = self._snapshot()
+        hits, ids, docs = self._search([embedding], fetch_k, filter, snapshot)
+        rows = [row for row, _ in hits[0]]
+        if not rows:
+            return []
+        selected = maximal_marginal_relevance(np.asarray(embedding, dtype=np.float32), self._row_vectors(snapshot, rows), lambda_mult, k)
+        return [doc for doc, _ in self._documents([hits[0][i] for i in selected], ids, docs)]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+                                      filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self.embedding.embed_query(query), k, fetch_k, lambda_mult, filter)
+
+    # Many questions at once: one embedding call and one matrix multiply per block
+    def batch_similarity_search(self, queries: Sequence[str], k: int = 4, filter: Optional[dict] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        hits, ids, docs = self._search(self.embedding.embed_documents(list(queries)), k, filter)
+        return [[doc for doc, _ in self._documents(query_hits, ids, docs)] for query_hits in hits]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._cosine_relevance_score_fn
+
+    # Writes vectors.npy (+ scales.npy, full.npy) and docs.json under `path`; each file is
+    # written to a temporary name first, so a crash never leaves a half-written index.
+    # An empty store writes empty arrays, so it loads back like any other.
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            count = self._count
+            dim = self.dim or 0
+            arrays = {
+                "vectors": self._matrix if self._matrix is not None else np.empty((0, dim), dtype=self.dtype),
+                "scales": self._scales if self._scales is not None or self.dtype != "int8" else np.empty((0,), dtype=np.float32),
+                "full": self._full if self._full is not None or not self.rescore else np.empty((0, dim), dtype=np.float32),
+            }
+            meta = {"dtype": self.dtype, "rescore": self.rescore, "dim": self.dim, "count": count}
+            docs = [{"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata} for doc_id, doc in zip(self._ids, self._docs)]
+        for name, array in arrays.items():
+            target = os.path.join(path, f"{name}.npy")
+            if array is None:
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            with open(target + ".tmp", "wb") as array_file:
+                np.save(array_file, np.ascontiguousarray(array[:count]))
+            os.replace(target + ".tmp", target)
+        with open(os.path.join(path, "docs.json.tmp"), "w", encoding="utf-8") as docs_file:
+            json.dump({"meta": meta, "docs": docs}, docs_file, ensure_ascii=False)
+        os.replace(os.path.join(path, "docs.json.tmp"), os.path.join(path, "docs.json"))
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True) -> "NumpyVectorStore":
+        with open(os.path.join(path, "docs.json"), "r", encoding="utf-8") as docs_file:
+            saved = json.load(docs_file)
+        meta = saved["meta"]
+        store = cls(embedding, dtype=meta["dtype"], rescore=meta["rescore"])
+        store.dim = meta["dim"]
+        mode = "r" if mmap else None
+        store._matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mode)
+        if os.path.exists(os.path.join(path, "scales.npy")):
+            # Scales are tiny; keep them in memory
+            store._scales = np.load(os.path.join(path, "scales.npy"))
+        if store.rescore and os.path.exists(os.path.join(path, "full.npy")):
+            store._full = np.load(os.path.join(path, "full.npy"), mmap_mode=mode)
+        elif store.rescore:
+            store.rescore = 0
+        for doc in saved["docs"]:
+            store._rows[doc["id"]] = len(store._ids)
+            store._ids.append(doc["id"])
+            store._docs.append(Document(page_content=doc["page_content"], metadata=doc["metadata"]))
+        store._count = meta["count"]
+        return store
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None,
+                   dtype: str = "float32", rescore: int = 0, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, dtype=dtype, rescore=rescore)
+        store.add_texts(texts, metadatas, ids)
+        return store
@@ -0,0 +1,51 @@
+# Offline tests for lc_checkpoint.CompactSqliteSaver
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from lc_checkpoint import CompactSqliteSaver
+
+def put(saver: CompactSqliteSaver, thread_id: str, messages: list, parent: dict = None) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": list(messages)}
+    config = parent or {"configurable": {"thread_id": thread_id}}
+    return saver.put(config, checkpoint, {"step": len(messages)})
+
+def messages_of(saver: CompactSqliteSaver, thread_id: str) -> list:
+    return saver.get_tuple({"configurable": {"thread_id": thread_id}}).checkpoint["channel_values"]["messages"]
+
+def test_history_round_trips_through_deltas_and_snapshots():
+    saver = CompactSqliteSaver(":memory:", keep_last=None, snapshot_every=3)
+    history, config = [], None
+    for i in range(10):
+        history += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+        config = put(saver, "t", history, config)
+    assert messages_of(saver, "t") == history
+    assert len(list(saver.list({"configurable": {"thread_id": "t"}}))) == 10
+
+def test_memoized_message_is_stored_for_every_thread():
+    # The digest memo is shared by all threads; a message first seen in one thread
+    # must still get its blob in the next
+    saver = CompactSqliteSaver(":memory:")
+    shared = [HumanMessage(content="hi im bob")]
+    put(saver, "first", shared)
+    put(saver, "second", shared)
+    assert messages_of(saver, "second") == shared
+
+def test_memoized_message_is_rewritten_after_blob_collection():
+    saver = CompactSqliteSaver(":memory:", keep_last=1, gc_every=1)
+    first, second = HumanMessage(content="first"), HumanMessage(content="second")
+    config = put(saver, "t", [first])
+    # Pruning the first checkpoint collects the blob of `first`, which stays memoized
+    config = put(saver, "t", [second], config)
+    put(saver, "t", [first], config)
+    assert messages_of(saver, "t") == [first]
+
+def test_only_the_newest_checkpoints_are_kept():
+    saver = CompactSqliteSaver(":memory:", keep_last=3, snapshot_every=16)
+    history, config = [], None
+    for i in range(8):
+        history.append(HumanMessage(content=f"message {i}"))
+        config = put(saver, "t", history, config)
+    kept = list(saver.list({"configurable": {"thread_id": "t"}}))
+    assert len(kept) == 3
+    # The oldest kept checkpoint was a delta whose parent was pruned; it still resolves
+    assert kept[-1].checkpoint["channel_values"]["messages"] == history[:6]
@@ -0,0 +1,49 @@
+# Offline tests for lc_concurrent_loader: streaming transcripts into an index as they load
+import time
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from lc_concurrent_loader import ConcurrentLoader
+from lc_fake import FakeEmbeddingServer, FakeEmbeddingClient, FakeTranscriptLoader
+from lc_pipeline import split_stream, upsert_stream
+from lc_vector_store import NumpyVectorStore
+
+def transcripts(count: int) -> dict:
+    return {f"video-{i}": (f"Transcript {i}. " * 40, {"title": f"Video {i}"}) for i in range(count)}
+
+def test_load_keeps_source_order_and_reports_failures():
+    fake = FakeTranscriptLoader(transcripts(5), latency=0.01, failing={"video-1"}, hanging={"video-3"}, hang_seconds=1.0)
+    docs, failures = ConcurrentLoader(fake, max_concurrency=5, timeout=0.2).load(list(transcripts(5)))
+    assert [doc.metadata["source"] for doc in docs] == ["video-0", "video-2", "video-4"]
+    assert failures["video-1"].startswith("ValueError")
+    assert failures["video-3"] == "timed out after 0.2s"
+
+def test_stream_yields_before_slow_sources_finish():
+    fake = FakeTranscriptLoader(transcripts(4), latency=0.01, hanging={"video-0"}, hang_seconds=0.5)
+    start = time.perf_counter()
+    stream = ConcurrentLoader(fake, max_concurrency=4, timeout=5.0).stream(list(transcripts(4)))
+    first = next(stream)
+    assert time.perf_counter() - start < 0.4
+    assert first.metadata["source"] != "video-0"
+    rest = list(stream)
+    assert sorted(doc.metadata["source"] for doc in [first, *rest]) == [f"video-{i}" for i in range(4)]
+
+def test_stream_backpressure_bounds_loaded_sources():
+    fake = FakeTranscriptLoader(transcripts(12), latency=0.0)
+    stream = ConcurrentLoader(fake, max_concurrency=2).stream(list(transcripts(12)))
+    next(stream)
+    time.sleep(0.2)
+    # One source taken, one queued and at most `max_concurrency` loaded and waiting
+    assert fake.calls <= 1 + 1 + 2
+    stream.close()
+
+def test_streamed_transcripts_are_indexed_with_failures_reported():
+    sources = list(transcripts(6))
+    fake = FakeTranscriptLoader(transcripts(6), latency=0.02, failing={"video-2"})
+    failures = {}
+    with FakeEmbeddingServer(latency=0.0, max_concurrent=16) as server:
+        store = NumpyVectorStore(FakeEmbeddingClient(server.url))
+        docs = ConcurrentLoader(fake, max_concurrency=3).stream(sources, failures)
+        stats = upsert_stream(split_stream(docs, RecursiveCharacterTextSplitter(chunk_size=200)), store, batch_size=4)
+    indexed = {metadata["source"] for metadata in store.get(include=["metadatas"])["metadatas"]}
+    assert indexed == set(sources) - {"video-2"}
+    assert list(failures) == ["video-2"]
+    assert stats["added"] == len(store) > len(indexed)
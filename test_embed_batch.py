@@ -0,0 +1,62 @@
+# Offline tests for lc_embed_batch against the lc_fake embedding server
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from lc_embed_batch import ConcurrentEmbeddings, pack_batches
+from lc_fake import FakeEmbeddingServer, FakeEmbeddingClient, fake_vector
+
+def test_pack_batches_respects_item_and_token_caps():
+    texts = [f"text {i}" for i in range(10)]
+    batches = pack_batches(texts, max_tokens=8000, max_items=4)
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [text for batch in batches for text in batch] == texts
+    assert all(len(batch) == 1 for batch in pack_batches(["x" * 400] * 3, max_tokens=150))
+
+def test_batches_are_sent_concurrently_and_returned_in_order():
+    texts = [f"sentence number {i}" for i in range(40)]
+    with FakeEmbeddingServer(latency=0.02, max_concurrent=8) as server:
+        engine = ConcurrentEmbeddings(FakeEmbeddingClient(server.url), max_concurrency=4, max_items=4)
+        vectors = engine.embed_documents(texts)
+    assert vectors == [fake_vector(text) for text in texts]
+    assert server.requests == 10
+    assert engine.stats()["batches"] == 10
+    assert engine.stats()["retries"] == 0
+
+def test_throttling_backs_off_and_retries_every_batch():
+    texts = [f"sentence number {i}" for i in range(60)]
+    with FakeEmbeddingServer(latency=0.05, max_concurrent=2, retry_after=0.01) as server:
+        engine = ConcurrentEmbeddings(FakeEmbeddingClient(server.url), max_concurrency=6, max_items=4, base_backoff=0.01)
+        vectors = engine.embed_documents(texts)
+    stats = engine.stats()
+    assert vectors == [fake_vector(text) for text in texts]
+    assert server.throttled > 0
+    # Every 429 was retried and counted once, and the limit backed off below its maximum
+    assert stats["retries"] == server.throttled
+    assert stats["batches"] == 15
+    assert stats["limit"] < 6
+
+def test_counters_are_exact_under_concurrent_callers():
+    with FakeEmbeddingServer(latency=0.0, max_concurrent=64) as server:
+        engine = ConcurrentEmbeddings(FakeEmbeddingClient(server.url), max_concurrency=8, max_items=2)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: engine.embed_documents([f"{i}-{j}" for j in range(8)]), range(16)))
+    assert engine.stats()["batches"] == 16 * 4 == server.requests
+
+def test_transient_errors_are_retried_without_backing_off():
+    texts = [f"sentence number {i}" for i in range(8)]
+    with FakeEmbeddingServer(latency=0.0, max_concurrent=8, failures=3) as server:
+        engine = ConcurrentEmbeddings(FakeEmbeddingClient(server.url), max_concurrency=4, max_items=2, base_backoff=0.01)
+        vectors = engine.embed_documents(texts)
+    stats = engine.stats()
+    assert vectors == [fake_vector(text) for text in texts]
+    # Each 503 was retried once; only 429s lower the concurrency limit
+    assert stats["transient_retries"] == 3 and stats["retries"] == 0
+    assert stats["limit"] == 4
+
+def test_client_errors_are_not_retried():
+    class Rejecting(FakeEmbeddingClient):
+        def embed_documents(self, texts):
+            raise ValueError("invalid input")
+    engine = ConcurrentEmbeddings(Rejecting("http://unused"), base_backoff=0.01)
+    with pytest.raises(ValueError):
+        engine.embed_documents(["text"])
+    assert engine.stats()["transient_retries"] == 0
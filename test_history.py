@@ -0,0 +1,114 @@
+# Offline tests for lc_history with the lc_fake chat model
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
+from lc_fake import FakeChatModel
+from lc_history import ContextRouter, HistoryCompactor, SpeculativeRetriever, question_similarity
+from lc_session_store import SessionStore
+
+def summarizer() -> FakeChatModel:
+    return FakeChatModel(default_response="summary", latency=0.0)
+
+def converse(compactor: HistoryCompactor, store: SessionStore, count: int, session_id: str = "s") -> list:
+    history = store.get_session_history(session_id)
+    compacted = []
+    for i in range(count):
+        history.add_messages([HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")])
+        compacted = compactor.compact(history.messages, session_id)
+    return compacted
+
+def turns(count: int) -> list:
+    return [message for i in range(count) for message in (HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}"))]
+
+def test_short_history_is_left_alone():
+    compactor = HistoryCompactor(summarizer(), max_turns=3)
+    assert converse(compactor, SessionStore(max_messages=100), 3) == turns(3)
+    assert compactor.summaries_made == 0
+
+def test_summary_folds_old_turns_and_keeps_recent_ones():
+    compactor = HistoryCompactor(summarizer(), max_turns=3)
+    compacted = converse(compactor, SessionStore(max_messages=100), 8)
+    assert isinstance(compacted[0], SystemMessage) and "summary" in compacted[0].content
+    assert compacted[-1].content == "answer 7"
+    assert len(compacted) - 1 <= 2 * 3
+    assert compactor.summaries_made > 0
+
+def test_summary_cache_survives_store_trimming():
+    # SessionStore drops the oldest messages beyond max_messages, which shifts every index
+    untrimmed = HistoryCompactor(summarizer(), max_turns=3)
+    converse(untrimmed, SessionStore(max_messages=1000), 40)
+    trimmed = HistoryCompactor(summarizer(), max_turns=3)
+    compacted = converse(trimmed, SessionStore(max_messages=20), 40)
+    assert trimmed.summaries_made == untrimmed.summaries_made
+    assert isinstance(compacted[0], SystemMessage)
+    assert compacted[-1].content == "answer 39"
+
+def test_summary_is_carried_forward_once_all_folded_messages_are_trimmed():
+    compactor = HistoryCompactor(summarizer(), max_turns=3)
+    messages = turns(8)
+    compacted = compactor.compact(messages, "s")
+    kept = len(compacted) - 1
+    # The store has since dropped every folded message
+    compacted = compactor.compact(messages[-kept:], "s")
+    assert isinstance(compacted[0], SystemMessage)
+    assert compacted[1:] == messages[-kept:]
+    assert compactor.summaries_made == 1
+
+def test_unrelated_history_does_not_reuse_the_summary():
+    compactor = HistoryCompactor(summarizer(), max_turns=3)
+    converse(compactor, SessionStore(max_messages=100), 8)
+    fresh = [HumanMessage(content="something else"), AIMessage(content="entirely")]
+    assert compactor.compact(fresh, "s") == fresh
+
+def speculative(rephrased: str, router: ContextRouter) -> SpeculativeRetriever:
+    prompt = ChatPromptTemplate.from_messages([MessagesPlaceholder("chat_history"), ("human", "{input}")])
+    retriever = RunnableLambda(lambda query: [Document(page_content=f"about {query}")])
+    return SpeculativeRetriever(FakeChatModel(default_response=rephrased, latency=0.05), retriever, prompt, router=router)
+
+def follow_up(question: str) -> dict:
+    return {"input": question, "chat_history": [HumanMessage(content="What is task decomposition?"), AIMessage(content="Splitting a task into steps.")]}
+
+def test_speculative_rephrase_is_timed_for_the_router():
+    router = ContextRouter()
+    retriever = speculative("What are the common ways of task decomposition?", router)
+    docs = retriever.as_runnable().invoke(follow_up("What are the common ways of doing it?"))
+    stats = router.stats()
+    assert stats["contextualized"] == 1
+    assert stats["avg_rephrase_seconds"] >= 0.05
+    # The rephrased question differs, so it is retrieved too and listed first
+    assert retriever.stats()["re_retrieved"] == 1
+    assert docs[0].page_content == "about What are the common ways of task decomposition?"
+
+def test_near_identical_rephrase_reuses_the_speculative_results():
+    router = ContextRouter()
+    retriever = speculative("what is it used for", router)
+    docs = retriever.as_runnable().invoke(follow_up("What is it used for?"))
+    assert retriever.stats()["reused"] == 1
+    assert [doc.page_content for doc in docs] == ["about What is it used for?"]
+
+def test_standalone_question_skips_the_rephrase():
+    router = ContextRouter()
+    retriever = speculative("unused", router)
+    retriever.as_runnable().invoke(follow_up("How does the transformer attention mechanism work in language models?"))
+    assert router.stats()["skipped"] == 1
+    assert router.stats()["avg_rephrase_seconds"] == 0.0
+
+def test_question_similarity_uses_cjk_bigrams():
+    assert question_similarity("勞工資遣費怎麼算", "勞工資遣費怎麼算？") == 1.0
+    assert 0.0 < question_similarity("勞工資遣費怎麼算", "資遣費的計算方式") < 1.0
+
+class TagRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.tags = []
+
+    def on_chat_model_start(self, serialized, messages, *, tags=None, **kwargs):
+        self.tags.extend(tags or [])
+
+def test_summarizer_runs_under_the_callers_config():
+    compactor = HistoryCompactor(summarizer(), max_turns=3)
+    recorder = TagRecorder()
+    compactor.compact(turns(8), "s", {"callbacks": [recorder], "tags": ["compaction"]})
+    assert compactor.summaries_made == 1
+    assert "compaction" in recorder.tags
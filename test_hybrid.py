@@ -0,0 +1,21 @@
+# Offline tests for lc_hybrid's article-aware BM25 index on text from data/LaborStandardsAct.pdf
+from langchain_core.documents import Document
+from lc_hybrid import BM25Index, tokenize
+
+ARTICLES = {
+    "84": "第 84 條 \n公務員兼具勞工身分者，其有關任（派）免、薪資、獎懲、退休、撫卹及保險（含職業\n災害）等事項，應適用公務員法令之規定。",
+    "84-1": "第 84-1 條 \n1  經中央主管機關核定公告之下列工作者，得由勞雇雙方另行約定，工作時間、例假、休 \n假、女性夜間工作，並報請當地主管機關核備。",
+    "84-2": "第 84-2 條 \n勞工工作年資自受僱之日起算，適用本法後之工作年資，其資遣費及退休金給與標準，依\n第十七條及第五十五條規定計算。",
+}
+
+def test_article_numbers_share_a_term_in_every_style():
+    assert tokenize("第 84-1 條")[:1] == tokenize("第84條之1") == tokenize("第八十四條之一") == ["條:84-1"]
+    assert tokenize("第 84 條") == ["條:84"]
+
+def test_sub_article_query_hits_lexically():
+    index = BM25Index()
+    index.add_documents(Document(page_content=text, metadata={"source": "act.pdf", "article": number}) for number, text in ARTICLES.items())
+    hits = index.search("第84條之1", k=1)
+    assert [index.docs[position].metadata["article"] for position, *_ in hits] == ["84-1"]
+    # In-text references are indexed too: 84-2 cites 第十七條
+    assert [index.docs[position].metadata["article"] for position, *_ in index.search("第 17 條", k=3)] == ["84-2"]
@@ -0,0 +1,53 @@
+# Offline tests for lc_legal_splitter on lines taken from data/LaborStandardsAct.pdf
+import os
+import pytest
+from langchain_core.documents import Document
+from lc_legal_splitter import LegalTextSplitter
+
+PDF = os.path.join(os.path.dirname(__file__), "data", "LaborStandardsAct.pdf")
+
+PAGE = """勞資關係，促進勞資合作，提高工作效率，事業單位應舉辦勞資會議。其辦法由
+中央主管機關會同經濟部訂定，並報行政院核定。
+第 84 條
+公務員兼具勞工身分者，其有關任（派）免、薪資、獎懲、退休、撫卹及保險（含職業
+災害）等事項，應適用公務員法令之規定。但其他所定勞動條件優於本法規定者，從其
+規定。
+第 84-1 條
+1  經中央主管機關核定公告之下列工作者，得由勞雇雙方另行約定，工作時間、例假、休
+假、女性夜間工作，並報請當地主管機關核備，不受第三十條、第三十二條、第三十六
+條、第三十七條、第四十九條規定之限制。
+第 84-2 條
+勞工工作年資自受僱之日起算，適用本法前之工作年資，其資遣費及退休金給與標準
+，依其當時應適用之法令規定計算；當時無法令可資適用者，依各該事業單位自訂之規
+定或勞雇雙方之協商計算之。適用本法後之工作年資，其資遣費及退休金給與標準，依
+第十七條及第五十五條規定計算。
+第 85 條
+本法施行細則，由中央主管機關擬定，報請行政院核定。 """
+
+def split(text: str, **kwargs) -> list:
+    return LegalTextSplitter(**kwargs).split_documents([Document(page_content=text, metadata={"source": "act.pdf", "page": 14})])
+
+def test_sub_articles_are_headings_of_their_own():
+    chunks = split(PAGE, target_chunk_size=1)
+    assert [chunk.metadata.get("article") for chunk in chunks] == [None, "84", "84-1", "84-2", "85"]
+    assert chunks[2].page_content.startswith("第 84-1 條")
+    # "第十七條及第五十五條規定計算" is a reference inside 84-2, not a heading
+    assert chunks[3].page_content.endswith("第十七條及第五十五條規定計算。")
+
+def test_written_out_sub_articles_share_the_numbering():
+    chunks = split("第八十四條之一 \n責任制專業人員。\n第八十四條之二 \n工作年資。", target_chunk_size=1)
+    assert [chunk.metadata["article"] for chunk in chunks] == ["84-1", "84-2"]
+
+def test_neighbouring_articles_are_packed_up_to_the_target():
+    chunks = split(PAGE)
+    assert [chunk.metadata.get("articles") for chunk in chunks] == [None, "84,84-1,84-2,85"]
+
+def test_structured_split_has_fewer_chunks_than_the_size_split():
+    pypdf = pytest.importorskip("pypdf")
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    pages = [Document(page_content=page.extract_text(), metadata={"source": PDF, "page": number})
+             for number, page in enumerate(pypdf.PdfReader(PDF).pages)]
+    chunks = LegalTextSplitter(max_chunk_size=1500, target_chunk_size=1200).split_documents(pages)
+    articles = {article for chunk in chunks for article in chunk.metadata.get("articles", "").split(",")}
+    assert {"9-1", "10-1", "15-1", "17-1", "22-1", "30-1", "32-1", "63-1", "79-1", "80-1", "84-1", "84-2"} <= articles
+    assert len(chunks) < len(RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents(pages))
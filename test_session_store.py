@@ -0,0 +1,32 @@
+# Offline tests for lc_session_store's durable SQLite tier
+import time
+import sqlite3
+from langchain_core.messages import AIMessage, HumanMessage
+from lc_session_store import SessionStore
+
+def rows(path: str) -> dict:
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT session_id, COUNT(*) FROM messages GROUP BY session_id").fetchall())
+
+def test_only_the_newest_messages_are_kept_on_disk(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(max_messages=6, path=path)
+    history = store.get_session_history("a")
+    for i in range(10):
+        history.add_messages([HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")])
+    store.get_session_history("b").add_message(HumanMessage(content="hello"))
+    assert rows(path) == {"a": 6, "b": 1}
+    # A restarted store still sees the newest messages
+    reloaded = SessionStore(max_messages=6, path=path).get_session_history("a")
+    assert [message.content for message in reloaded.messages][-2:] == ["question 9", "answer 9"]
+
+def test_idle_sessions_are_purged_from_disk(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(max_sessions=1, ttl=0.2, path=path, purge_interval=0.0)
+    store.get_session_history("evicted").add_message(HumanMessage(content="old"))
+    store.get_session_history("idle").add_message(HumanMessage(content="old"))
+    time.sleep(0.25)
+    # Both older sessions have left memory (LRU and TTL) and are deleted on disk as well
+    store.get_session_history("active").add_message(HumanMessage(content="new"))
+    assert rows(path) == {"active": 1}
+    assert store.purged == 2
@@ -0,0 +1,23 @@
+# Offline tests for lc_stream's node timing on a small tool-calling graph
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, MessagesState, StateGraph
+from langgraph.prebuilt import tools_condition
+from lc_fake import FakeChatModel, FakeWikipediaTool
+from lc_stream import stream_graph
+from lc_tool_node import create_concurrent_tool_node
+
+def test_each_node_run_is_timed_once():
+    tool = FakeWikipediaTool(pages={"Taoyuan": "Taoyuan is a city in northern Taiwan."}, latency=0.0)
+    model = FakeChatModel(tool_call={"name": tool.name, "args": {"query": "Taoyuan"}}, default_response="Taoyuan is in Taiwan.", latency=0.0)
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", lambda state: {"messages": [model.invoke(state["messages"])]})
+    # The concurrent tools node is itself a runnable named "tools"
+    graph.add_node("tools", create_concurrent_tool_node([tool]))
+    graph.set_entry_point("agent")
+    graph.add_conditional_edges("agent", tools_condition)
+    graph.add_edge("tools", "agent")
+    tokens = []
+    state, metrics = stream_graph(graph.compile(), {"messages": [HumanMessage(content="Where is Taoyuan?")]}, on_token=tokens.append, nodes=("agent", "tools"))
+    assert state["messages"][-1].content == "Taoyuan is in Taiwan."
+    assert "".join(tokens) == "Taoyuan is in Taiwan."
+    assert {node: stats["calls"] for node, stats in metrics["nodes"].items()} == {"agent": 2, "tools": 1}
@@ -0,0 +1,71 @@
+# Offline tests for lc_tool_cache with the lc_fake Wikipedia tool
+import time
+import threading
+from lc_fake import FakeWikipediaTool
+from lc_tool_cache import ToolResultCache, cached_tool, normalize_query
+
+def wikipedia(latency: float = 0.0) -> FakeWikipediaTool:
+    return FakeWikipediaTool(pages={"Taoyuan": "Taoyuan is a city in northern Taiwan."}, latency=latency)
+
+def test_normalized_queries_share_a_key():
+    assert normalize_query("  Who is the Mayor of Taoyuan City? ") == normalize_query("who is the mayor of taoyuan city")
+
+def test_punctuation_inside_a_query_is_kept():
+    assert len({normalize_query(query) for query in ("C++", "C#", "C")}) == 3
+    assert normalize_query("pi 3.14") != normalize_query("pi 3 14")
+    assert normalize_query("ＣＰＵ？") == normalize_query("cpu.") == "cpu"
+
+def test_repeated_query_is_a_hit():
+    tool = wikipedia()
+    cached = cached_tool(tool, ttl=60.0)
+    first = cached.run("Taoyuan mayor")
+    assert cached.run("  taoyuan MAYOR? ") == first
+    assert tool.calls == 1
+    assert cached.cache.stats()["hits"] == 1
+    assert cached.name == tool.name and cached.description == tool.description
+
+def test_empty_search_result_is_not_cached():
+    tool = wikipedia()
+    cached = cached_tool(tool, ttl=60.0)
+    assert cached.run("Tayouan").startswith("No good Wikipedia Search Result")
+    cached.run("Tayouan")
+    assert tool.calls == 2
+    assert cached.cache.stats()["entries"] == 0
+
+def test_entries_expire_after_ttl():
+    tool = wikipedia()
+    cached = cached_tool(tool, ttl=0.1)
+    cached.run("Taoyuan")
+    cached.run("Taoyuan")
+    time.sleep(0.15)
+    cached.run("Taoyuan")
+    assert tool.calls == 2
+    assert cached.cache.stats()["misses"] == 2
+
+def test_disk_tier_survives_a_restart_until_expiry(tmp_path):
+    path = str(tmp_path / "wikipedia.sqlite")
+    cached_tool(wikipedia(), ttl=0.3, path=path).run("Taoyuan")
+    tool = wikipedia()
+    cached_tool(tool, ttl=0.3, path=path).run("Taoyuan")
+    assert tool.calls == 0
+    time.sleep(0.35)
+    cached_tool(tool, ttl=0.3, path=path).run("Taoyuan")
+    assert tool.calls == 1
+
+def test_concurrent_misses_are_coalesced():
+    cache = ToolResultCache(ttl=60.0)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
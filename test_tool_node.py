@@ -0,0 +1,30 @@
+# Offline tests for lc_tool_node with the lc_fake Wikipedia tool
+import time
+import threading
+from langchain_core.messages import AIMessage
+from lc_fake import FakeWikipediaTool
+from lc_tool_node import _Slot, create_concurrent_tool_node
+
+def turn(*names: str) -> dict:
+    calls = [{"name": name, "args": {"query": "Taoyuan"}, "id": f"call_{i}"} for i, name in enumerate(names)]
+    return {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+def test_hung_call_gives_its_slot_back_after_its_timeout():
+    # A later call took the only slot and hangs; nobody is waiting on it yet
+    semaphore = threading.Semaphore(1)
+    hung, queued = _Slot(semaphore, timeout=0.1), _Slot(semaphore, timeout=1.0)
+    hung.acquire()
+    threading.Thread(target=queued.acquire, daemon=True).start()
+    assert queued.started.wait(timeout=1.0)
+    queued.release()
+    hung.release()
+
+def test_calls_time_out_and_keep_their_order():
+    fast = FakeWikipediaTool(pages={"Taoyuan": "A city in Taiwan."}, latency=0.0)
+    slow = FakeWikipediaTool(name="slow", latency=1.0)
+    node = create_concurrent_tool_node([fast, slow], max_concurrency=1, timeouts={"slow": 0.1}, default_timeout=1.0)
+    start = time.monotonic()
+    messages = node.invoke(turn("wikipedia", "slow", "slow", "wikipedia"))["messages"]
+    assert time.monotonic() - start < 0.8
+    assert [message.tool_call_id for message in messages] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [message.content.startswith("Error: slow timed out") for message in messages] == [False, True, True, False]
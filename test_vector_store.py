@@ -0,0 +1,30 @@
+# Offline tests for lc_vector_store.NumpyVectorStore against the lc_fake embedding server
+import numpy as np
+from langchain_core.documents import Document
+from lc_fake import FakeEmbeddingServer, FakeEmbeddingClient, fake_vector
+from lc_vector_store import NumpyVectorStore
+
+def test_quantized_scores_stay_within_cosine_range():
+    vectors = np.random.default_rng(0).normal(size=(50, 64)).astype(np.float32)
+    store = NumpyVectorStore(None, dtype="int8")
+    store.add_vectors(vectors, [Document(page_content=str(i)) for i in range(50)])
+    hits = store.search_vectors(vectors, k=1)
+    assert all(-1.0 <= score <= 1.0 for query_hits in hits for _, score in query_hits)
+    assert [query_hits[0][0] for query_hits in hits] == list(range(50))
+    assert store._cosine_relevance_score_fn(store.similarity_search_by_vector_with_score(vectors[0], k=1)[0][1]) <= 1.0
+
+def test_mmr_skips_near_duplicates():
+    base, other = np.eye(4, dtype=np.float32)[0], np.eye(4, dtype=np.float32)[1]
+    vectors = [base, base + 0.01 * other, 0.7 * base + 0.7 * other]
+    store = NumpyVectorStore(None)
+    store.add_vectors(vectors, [Document(page_content=text) for text in ("original", "duplicate", "different")])
+    assert [doc.page_content for doc in store.similarity_search_by_vector(base, k=2)] == ["original", "duplicate"]
+    assert [doc.page_content for doc in store.max_marginal_relevance_search_by_vector(base, k=2, fetch_k=3, lambda_mult=0.25)] == ["original", "different"]
+
+def test_mmr_retriever():
+    texts = [f"chunk {i}" for i in range(10)]
+    with FakeEmbeddingServer(latency=0.0) as server:
+        store = NumpyVectorStore.from_texts(texts, FakeEmbeddingClient(server.url), metadatas=[{"part": i % 2} for i in range(10)], dtype="int8", rescore=4)
+        docs = store.as_retriever(search_type="mmr", search_kwargs={"k": 3, "fetch_k": 6, "filter": {"part": 0}}).invoke("chunk 4")
+    assert docs[0].page_content == "chunk 4"
+    assert len(docs) == 3 and all(doc.metadata["part"] == 0 for doc in docs)